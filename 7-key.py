@@ -1,25 +1,18 @@
 import time
-import board
-import busio
-import adafruit_mpr121
 import mido
+from keymap import compile_scale_table
+from latency import LatencyTracker
+from sensor import TouchScanner, open_backend
 
-# Setup I2C and MPR121
-i2c = busio.I2C(board.SCL, board.SDA)
-mpr121 = adafruit_mpr121.MPR121(i2c)
+# Setup MPR121 (or replay a trace from TOUCH_REPLAY)
+scanner = TouchScanner(open_backend())
 
 # MIDI note mapping for C major scale
 # 0: C4 (60), 1: D4 (62), 2: E4 (64), 3: F4 (65)
 # 0+1: G4 (67), 1+2: A4 (69), 2+3: B4 (71)
-key_map = {
-    (1, 1, 0, 0): 67,  # 0+1 -> G4
-    (0, 1, 1, 0): 69,  # 1+2 -> A4
-    (0, 0, 1, 1): 71,  # 2+3 -> B4
-    (1, 0, 0, 0): 60,  # 0 -> C4
-    (0, 1, 0, 0): 62,  # 1 -> D4
-    (0, 0, 1, 0): 64,  # 2 -> E4
-    (0, 0, 0, 1): 65,  # 3 -> F4
-}
+C_MAJOR = [60, 62, 64, 65, 67, 69, 71]
+# Touch mask -> note, one index per poll
+note_table = compile_scale_table(C_MAJOR)
 
 # Find rtpmidid port
 def find_rtpmidi_port():
@@ -31,23 +24,32 @@ def find_rtpmidi_port():
 rtpmidi_port_name = 'rtpmidid:Network Export 128:0'
 outport = mido.open_output(rtpmidi_port_name)
 
+# Touch-to-MIDI latency, dumped on exit or with kill -USR1
+latency = LatencyTracker()
+latency.install()
+
 last_note = None
 
 try:
     while True:
-        # Read touch state for pins 0-3
-        state = tuple(int(mpr121[i].value) for i in range(4))
-        note = key_map.get(state)
+        # Read all 12 pins in one transaction
+        mask = scanner.read_mask()
+        t_read = time.monotonic_ns()
+        note = note_table[mask]
+        t_mapped = time.monotonic_ns()
         if note != last_note:
             # Send Note Off for previous note
             if last_note is not None:
                 msg = mido.Message('note_off', note=last_note, velocity=0)
                 outport.send(msg)
+                t_sent = time.monotonic_ns()
             # Send Note On for new note
             if note is not None:
                 msg = mido.Message('note_on', note=note, velocity=100)
                 outport.send(msg)
+                t_sent = time.monotonic_ns()
                 print(f"Note On: {note}")
+            latency.record(t_read, t_mapped, t_sent)
             last_note = note
         time.sleep(0.01)
 except KeyboardInterrupt:
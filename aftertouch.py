@@ -0,0 +1,74 @@
+"""Pressure on the held key pins as poly or channel aftertouch"""
+import numpy as np
+from baseline import BaselineTracker
+from filters import CHANNELS, DeadbandStage, EMAStage, FilterBank, ScaleStage
+from midi_out import MESSAGES
+
+POLY = 'poly'
+CHANNEL = 'channel'
+
+# Bit value of each pin, to turn a touch mask into a pin selection
+PIN_BITS = 1 << np.arange(CHANNELS)
+
+
+class Aftertouch:
+    """Turns 12-electrode frames into aftertouch for the sounding notes
+
+    Each frame is smoothed (EMA), scaled from the pin's live baseline
+    (0) to its full-press level (127) and deadbanded, all 12 pins at once.
+    A note's pressure is the hardest-pressed of the key pins holding it.
+    In poly mode every sounding note gets its own message; in channel mode
+    the whole channel gets one. A value goes out only when it differs from
+    the last one sent for that note, and the caller sets the frame rate, so
+    nothing is sent faster than that however noisy the pads are.
+    """
+
+    def __init__(self, out, mode=POLY, channel=0, alpha=0.5, deadband=2, profile=None):
+        if mode not in (POLY, CHANNEL):
+            raise ValueError(f"Unknown aftertouch mode: {mode}")
+        self.out = out
+        self.mode = mode
+        self.channel = channel
+        self.tracker = BaselineTracker(profile=profile)
+        self.scale = ScaleStage(0, 1)
+        self.bank = FilterBank([EMAStage(alpha), self.scale, DeadbandStage(deadband)])
+        # Last value sent, per note (poly) or for the channel
+        self.last_sent = {}
+        self.last_channel = 0
+        self.pressure = np.zeros(CHANNELS, dtype=np.intp)
+        self.sent = 0
+
+    def update(self, frame, timestamp, key_mask, notes):
+        """Fold in one frame; key_mask holds the touched key pins, notes the sounding ones"""
+        tracker = self.tracker
+        # A key holding a sounding note is a long press, never drift
+        tracker.update(frame, timestamp, key_mask if notes else 0)
+        self.scale.set_range(tracker.touch_min, tracker.touch_max)
+        np.rint(self.bank.process(frame), out=self.pressure, casting='unsafe')
+        held = (key_mask & PIN_BITS) != 0
+        value = int(self.pressure[held].max()) if notes and held.any() else 0
+        if self.mode == POLY:
+            self.send_poly(notes, value)
+        else:
+            self.send_channel(value)
+
+    def send_poly(self, notes, value):
+        last_sent = self.last_sent
+        for note in notes:
+            if last_sent.get(note) != value:
+                self.out.send_bytes(MESSAGES.poly_aftertouch(note, self.channel)[value])
+                last_sent[note] = value
+                self.sent += 1
+        # Released notes start from scratch next time they sound; a count
+        # check would miss a note swapped for another
+        for note in [note for note in last_sent if note not in notes]:
+            del last_sent[note]
+
+    def send_channel(self, value):
+        if value != self.last_channel:
+            self.out.send_bytes(MESSAGES.channel_pressure(self.channel)[value])
+            self.last_channel = value
+            self.sent += 1
+
+    def stats(self):
+        return f"Aftertouch ({self.mode}): sent={self.sent}"
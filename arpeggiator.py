@@ -0,0 +1,145 @@
+"""Arpeggiator task scheduled on absolute monotonic deadlines"""
+import asyncio
+import time
+from latency import LatencyHistogram
+from midi_clock import PPQN
+from midi_out import NOTE_OFF_BYTES, NOTE_ON_BYTES, encode_note_batch
+
+
+class Arpeggiator:
+    """Steps through the held notes at the tempo from get_tempo()
+
+    run() is one task on the engine's event loop for the life of the app;
+    set_active() starts and stops arpeggiating and set_notes() swaps the
+    note list, which the task picks up at its next step. Step times are
+    absolute deadlines (previous deadline + one step), so time spent
+    sending never adds up into drift. gate is the fraction of a step each
+    note sounds; at 1.0 notes are legato and the off goes out with the
+    next note's on.
+
+    With a ClockFollower as clock, steps land on the external clock's grid
+    whenever it is locked, and get_tempo() is only used when it isn't.
+    """
+
+    def __init__(self, out, get_tempo, gate=1.0, steps_per_beat=1, clock=None):
+        self.out = out              # MIDI sender the notes go to
+        self.get_tempo = get_tempo  # function returning tempo in BPM
+        self.clock = clock
+        self.gate = gate
+        self.steps_per_beat = steps_per_beat
+        self.notes = ()
+        self.active = False
+        self.running = True
+        self.last_note = None
+        self.wakeup = asyncio.Event()
+        # How late each step's note-on went out against its deadline
+        self.timing_error = LatencyHistogram()
+        self.steps = 0
+
+    def stop(self):
+        """Let run() finish, sending the note-off for anything still sounding"""
+        self.running = False
+        self.wakeup.set()
+        print(self.stats())
+
+    def set_active(self, active):
+        self.active = active
+        if not active:
+            # Silence now rather than at the task's next wakeup, so notes
+            # played right after (e.g. by another mode) aren't cut off
+            self.note_off()
+        self.wakeup.set()
+
+    def set_notes(self, notes):
+        """Replace the notes to arpeggiate, from the next step on"""
+        notes = tuple(notes)
+        if notes != self.notes:
+            # A single reference swap, so the task never sees half a list
+            self.notes = notes
+            self.wakeup.set()
+
+    def step_ns(self):
+        return int(60e9 / max(self.get_tempo(), 1) / self.steps_per_beat)
+
+    async def wait_until(self, deadline):
+        """Sleep until a monotonic_ns deadline; False if stopped or released meanwhile"""
+        while self.running and self.active and self.notes:
+            remaining = deadline - time.monotonic_ns()
+            if remaining <= 0:
+                return True
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), remaining / 1e9)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+        return False
+
+    def note_off(self):
+        if self.last_note is not None:
+            self.out.send_bytes(NOTE_OFF_BYTES[self.last_note])
+            self.last_note = None
+
+    def next_clock_step(self, now, last_tick, starts):
+        """(tick, deadline, step) on the external clock, None to free-run"""
+        if self.clock is None:
+            return None
+        if starts != self.clock.starts:
+            # The DAW pressed Start again: tick numbers began from zero
+            last_tick = None
+        return self.clock.next_step(PPQN // self.steps_per_beat, now, last_tick)
+
+    async def run(self):
+        try:
+            await self.play()
+        finally:
+            # Turn off last note when stopped or cancelled
+            self.note_off()
+
+    async def play(self):
+        idx = 0
+        deadline = None
+        last_tick = None
+        starts = None
+        while self.running:
+            notes = self.notes
+            if not (self.active and notes):
+                self.note_off()
+                idx = 0
+                deadline = None
+                last_tick = None
+                await self.wakeup.wait()
+                self.wakeup.clear()
+                continue
+            now = time.monotonic_ns()
+            synced = self.next_clock_step(now, last_tick, starts)
+            if synced is not None:
+                last_tick, deadline, step = synced
+                starts = self.clock.starts
+            else:
+                last_tick = None
+                step = self.step_ns()
+                if deadline is None or now - deadline > step:
+                    # First step, or a whole step behind: restart the grid
+                    # here instead of firing the missed steps in a burst
+                    deadline = now
+            if not await self.wait_until(deadline):
+                continue
+            # Notes may have changed while waiting: play what's held now
+            notes = self.notes
+            if not notes:
+                continue
+            note = notes[idx % len(notes)]
+            if self.last_note is not None:
+                self.out.send_bytes(encode_note_batch((self.last_note,), (note,)))
+            else:
+                self.out.send_bytes(NOTE_ON_BYTES[note])
+            self.timing_error.record(time.monotonic_ns() - deadline)
+            self.last_note = note
+            self.steps += 1
+            idx += 1
+            if self.gate < 1.0 and await self.wait_until(deadline + int(step * self.gate)):
+                self.note_off()
+            deadline += step
+
+    def stats(self):
+        return f"Arpeggiator: steps={self.steps} timing error {self.timing_error.summary()}"
@@ -0,0 +1,228 @@
+"""Live per-electrode baselines, replacing the blocking calibrate() routine
+
+calibrate() in the touch/ control tools stops everything for ~8 seconds,
+samples pin 0 only and is never repeated, so temperature and humidity
+drift the range away during a long set. BaselineTracker follows every
+electrode from the frames the control loop already reads: each untouched
+pin's baseline creeps towards its reading, a touched pin's baseline is
+frozen, and the depth of recent touches sets how far a full press goes.
+
+The tracked values are saved as a calibration profile on exit and loaded
+on the next start, so pins that still read where they did come up
+calibrated on the first frame.
+"""
+import json
+import math
+import os
+import numpy as np
+
+# One column per electrode
+CHANNELS = 12
+
+# Same hysteresis as the MPR121's default thresholds (and ReplayBackend)
+TOUCH_THRESHOLD = 12
+RELEASE_THRESHOLD = 6
+
+# Calibration profiles: {"version": 1, "boards": {"0x5a": {"0": {"baseline": ...,
+# "reach": ...}, ...}}}, one entry per board address and pin
+PROFILE_VERSION = 1
+PROFILE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'calibration.json')
+
+
+class BaselineTracker:
+    """Baseline, touch state and touch range for every electrode
+
+    update() takes one frame and its timestamp. A touch pulls the reading
+    down, so a pin counts as touched once it falls touch_threshold below
+    its baseline and as released when it comes back within
+    release_threshold. While untouched its baseline follows the reading
+    with time constant `drift_seconds`, fast enough for temperature and
+    humidity and too slow to swallow a touch. The first `settle_seconds`
+    use `settle_drift_seconds` instead, so the baseline locks on quickly
+    after power-up. A reading well above the baseline (more than
+    touch_threshold) can't be a touch, so the baseline follows it within
+    `rise_seconds`, touched or not, as the MPR121's own baseline filter
+    does; a baseline taken while a pad was pressed recovers as soon as it
+    is let go. A pin that reads as touched
+    for longer than `max_touch_seconds` is taken to be a baseline jump and
+    its baseline is reset to the reading, unless it is in update()'s
+    `held` mask: a pin holding a sounding note is a long press, not drift.
+
+    With a `profile` from load_profile(), the first frame checks every
+    stored pin: one reading within `tolerance` of its stored baseline keeps
+    the stored baseline and reach and skips the settling period; the rest
+    (listed in `recalibrated`) start from the reading like a fresh pin.
+
+    `reach` is the signed distance from the baseline to a full press,
+    averaged over the peaks of recent touches; it starts at
+    `initial_reach` (negative, since the MPR121's filtered data falls when
+    a pad is touched). touch_min and touch_max are the live ends of the
+    control range, for scale_value() or ScaleStage.set_range().
+    """
+
+    def __init__(self, channels=CHANNELS, touch_threshold=TOUCH_THRESHOLD,
+                 release_threshold=RELEASE_THRESHOLD, drift_seconds=30.0,
+                 settle_seconds=1.0, settle_drift_seconds=0.1,
+                 initial_reach=-4 * TOUCH_THRESHOLD, reach_alpha=0.25,
+                 max_touch_seconds=30.0, rise_seconds=0.1, profile=None,
+                 tolerance=RELEASE_THRESHOLD):
+        self.channels = channels
+        self.touch_threshold = touch_threshold
+        self.release_threshold = release_threshold
+        self.drift_seconds = drift_seconds
+        self.settle_seconds = settle_seconds
+        self.settle_drift_seconds = settle_drift_seconds
+        self.reach_alpha = reach_alpha
+        self.max_touch_seconds = max_touch_seconds
+        self.rise_seconds = rise_seconds
+        self.profile = profile or {}
+        self.tolerance = tolerance
+        self.recalibrated = []
+        self.baseline = np.zeros(channels)
+        self.reach = np.full(channels, float(initial_reach))
+        self.touched = np.zeros(channels, dtype=bool)
+        # Largest deviation of the touch in progress, per pin
+        self.peak = np.zeros(channels)
+        self.touched_since = np.zeros(channels)
+        self.deviation = np.zeros(channels)
+        self.depth = np.zeros(channels)
+        self.pin_bits = 1 << np.arange(channels)
+        self.start_time = None
+        self.last_time = None
+        self.frames = 0
+        self.settling = np.ones(channels, dtype=bool)
+
+    @property
+    def touch_min(self):
+        """Untouched level per pin"""
+        return self.baseline
+
+    @property
+    def touch_max(self):
+        """Full-press level per pin"""
+        return self.baseline + self.reach
+
+    @property
+    def mask(self):
+        """Touched pins as a 12-bit mask, like TouchScanner.read_mask()"""
+        return int(np.dot(self.touched, self.pin_bits))
+
+    def seed(self, baseline, reach=None):
+        """Start from known baselines (and reaches) instead of the first frame"""
+        self.baseline[:] = baseline
+        if reach is not None:
+            self.reach[:] = reach
+        self.frames = max(self.frames, 1)
+        # Known baselines only need the slow drift
+        self.settling[:] = False
+
+    def warm_start(self, frame):
+        """Take stored calibration for pins still reading near their baseline"""
+        self.recalibrated = []
+        for pin, (baseline, reach) in self.profile.items():
+            if pin >= self.channels:
+                continue
+            if abs(frame[pin] - baseline) <= self.tolerance:
+                self.baseline[pin] = baseline
+                self.reach[pin] = reach
+                self.settling[pin] = False
+            else:
+                self.recalibrated.append(pin)
+
+    def update(self, frame, timestamp, held=0):
+        """Fold one frame in; returns the touched pins as a bool array
+
+        held is a mask of pins whose touch is in use (a sounding note), so
+        they are never reset for being touched too long.
+        """
+        if self.frames == 0:
+            # Assume nothing is touched at power-up, as the MPR121 does
+            self.baseline[:] = frame
+            self.warm_start(frame)
+            self.start_time = self.last_time = timestamp
+            self.frames = 1
+            return self.touched
+        if self.start_time is None:
+            self.start_time = self.last_time = timestamp
+        dt = max(timestamp - self.last_time, 0.0)
+        self.last_time = timestamp
+        self.frames += 1
+
+        np.subtract(frame, self.baseline, out=self.deviation)
+        np.negative(self.deviation, out=self.depth)
+        was_touched = self.touched.copy()
+        # Hysteresis: a touched pin stays touched until it comes back close
+        self.touched[:] = np.where(was_touched, self.depth > self.release_threshold,
+                                   self.depth > self.touch_threshold)
+
+        # Track each touch's peak, and fold it into reach on release
+        self.touched_since[self.touched & ~was_touched] = timestamp
+        pressing = self.touched & (self.depth > -self.peak)
+        self.peak[pressing] = self.deviation[pressing]
+        released = was_touched & ~self.touched
+        if released.any():
+            self.reach[released] += self.reach_alpha * (self.peak[released] - self.reach[released])
+            self.peak[released] = 0
+
+        # Untouched pins drift with the room; touched pins stay frozen,
+        # except that any pin reading above its baseline catches up fast
+        if self.settling.any() and timestamp - self.start_time >= self.settle_seconds:
+            self.settling[:] = False
+        slow = 1 - math.exp(-dt / self.drift_seconds)
+        fast = 1 - math.exp(-dt / self.settle_drift_seconds) if self.settle_drift_seconds > 0 else 1.0
+        rise = 1 - math.exp(-dt / self.rise_seconds) if self.rise_seconds > 0 else 1.0
+        alpha = np.where(self.settling, fast, slow)
+        # Past the noise, so sensor noise can't ratchet the baseline up
+        rising = self.deviation > self.touch_threshold
+        alpha[rising] = np.maximum(alpha[rising], rise)
+        moving = ~self.touched | rising
+        self.baseline[moving] += alpha[moving] * self.deviation[moving]
+        if self.max_touch_seconds is not None:
+            stuck = self.touched & (timestamp - self.touched_since > self.max_touch_seconds)
+            if held:
+                stuck &= (held & self.pin_bits) == 0
+            if stuck.any():
+                self.baseline[stuck] += self.deviation[stuck]
+                self.touched[stuck] = False
+                self.peak[stuck] = 0
+        return self.touched
+
+
+def load_profile(address, path=PROFILE_PATH):
+    """Stored {pin: (baseline, reach)} for the board at address, or {}"""
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        print(f"Calibration profile unreadable, starting fresh: {e}")
+        return {}
+    if data.get('version') != PROFILE_VERSION:
+        print(f"Calibration profile version {data.get('version')} not supported, starting fresh")
+        return {}
+    pins = data.get('boards', {}).get(f"0x{address:02x}", {})
+    return {int(pin): (entry['baseline'], entry['reach']) for pin, entry in pins.items()}
+
+
+def save_profile(address, tracker, path=PROFILE_PATH):
+    """Store the tracker's baselines and reaches under the board's address"""
+    data = {'version': PROFILE_VERSION, 'boards': {}}
+    try:
+        with open(path) as f:
+            stored = json.load(f)
+        if stored.get('version') == PROFILE_VERSION:
+            # Keep the other boards' profiles
+            data = stored
+    except (OSError, ValueError):
+        pass
+    data['boards'][f"0x{address:02x}"] = {
+        str(pin): {'baseline': round(float(tracker.baseline[pin]), 2),
+                   'reach': round(float(tracker.reach[pin]), 2)}
+        for pin in range(tracker.channels)
+    }
+    # Write then rename, so a crash mid-save can't leave half a file
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
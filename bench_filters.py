@@ -0,0 +1,117 @@
+import sys
+import time
+import numpy as np
+from collections import deque
+from filters import (CHANNELS, DeadbandStage, EMAStage, FilterBank, MedianStage, RunningMean,
+                     SMAStage, ScaleStage, SlidingMedian)
+
+# Cost of conditioning every electrode per frame with the filter bank,
+# against running touch_control.py's per-float helpers once per pin; then
+# the single-stream moving average and median at window sizes 5-1000,
+# against pin0_smooth.py's old sum() and sorted() versions.
+# Usage: python bench_filters.py [frames]
+
+WINDOWS = [5, 10, 50, 100, 500, 1000]
+
+
+def exponential_smooth(new_value, smoothed_value, alpha):
+    if smoothed_value is None:
+        return new_value
+    return alpha * new_value + (1 - alpha) * smoothed_value
+
+
+def apply_deadband(new_value, last_value, deadband):
+    if last_value is None:
+        return new_value
+    if abs(new_value - last_value) < deadband:
+        return last_value
+    return new_value
+
+
+def scale_value(value, input_min, input_max, output_min, output_max):
+    if input_max == input_min:
+        return output_min
+    value = max(input_min, min(input_max, value))
+    normalized = (value - input_min) / (input_max - input_min)
+    return output_min + normalized * (output_max - output_min)
+
+
+def deque_mean(samples, window):
+    buffer = deque(maxlen=window)
+    for value in samples:
+        buffer.append(value)
+        sum(buffer) / len(buffer)
+
+
+def sorted_median(samples, window):
+    buffer = deque(maxlen=window)
+    for value in samples:
+        buffer.append(value)
+        sorted_values = sorted(buffer)
+        n = len(sorted_values)
+        if n % 2 == 0:
+            (sorted_values[n//2 - 1] + sorted_values[n//2]) / 2
+        else:
+            sorted_values[n//2]
+
+
+def running_mean(samples, window):
+    add = RunningMean(window).add
+    for value in samples:
+        add(value)
+
+
+def sliding_median(samples, window):
+    add = SlidingMedian(window).add
+    for value in samples:
+        add(value)
+
+
+def per_sample_us(fn, samples, window):
+    start = time.perf_counter()
+    fn(samples, window)
+    return (time.perf_counter() - start) / len(samples) * 1e6
+
+
+def per_pin(frames):
+    smoothed = [None] * CHANNELS
+    last = [None] * CHANNELS
+    for frame in frames:
+        for pin in range(CHANNELS):
+            smoothed[pin] = exponential_smooth(frame[pin], smoothed[pin], 0.4)
+            last[pin] = apply_deadband(smoothed[pin], last[pin], 2)
+            scale_value(last[pin], 300, 600, 0, 127)
+
+
+def bank(frames, stages):
+    filter_bank = FilterBank(stages)
+    for frame in frames:
+        filter_bank.process(frame)
+
+
+def bench(name, fn, frames, *args):
+    start = time.perf_counter()
+    fn(frames, *args)
+    elapsed = time.perf_counter() - start
+    per_frame = elapsed / len(frames)
+    print(f"{name:<50} {per_frame * 1e6:7.1f} us/frame  (max {1 / per_frame:7.0f} Hz)")
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    frames = np.random.default_rng(0).integers(200, 700, size=(count, CHANNELS)).astype(np.uint16)
+    frame_lists = frames.tolist()
+    print(f"{count} frames of {CHANNELS} electrodes")
+    bench("per pin: EMA + deadband + scale (Python)", per_pin, frame_lists)
+    bench("bank: EMA + deadband + scale", bank, frames,
+          [EMAStage(0.4), DeadbandStage(2), ScaleStage(300, 600)])
+    bench("bank: median 5 + SMA 5 + EMA + deadband + scale", bank, frames,
+          [MedianStage(5), SMAStage(5), EMAStage(0.4), DeadbandStage(2), ScaleStage(300, 600)])
+    samples = frames[:, 0].tolist()
+    print(f"\nOne stream of {count} samples, us/sample")
+    print(f"{'window':>6} | {'sum()':>8} {'running':>8} | {'sorted()':>9} {'2 heaps':>8}")
+    for window in WINDOWS:
+        print(f"{window:6} | {per_sample_us(deque_mean, samples, window):8.2f} "
+              f"{per_sample_us(running_mean, samples, window):8.2f} | "
+              f"{per_sample_us(sorted_median, samples, window):9.2f} "
+              f"{per_sample_us(sliding_median, samples, window):8.2f}")
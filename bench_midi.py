@@ -0,0 +1,131 @@
+import sys
+import time
+import mido
+from midi_out import MESSAGES, NOTE_OFF_BYTES, NOTE_ON_BYTES, MidiSender, NoteTracker, encode_note_batch
+
+# Compares building a mido.Message per event with sending pre-encoded
+# bytes from the message cache, on a port that drops everything.
+# Usage: python bench_midi.py [events]
+
+
+class NullMidiOut:
+    """Stands in for rtmidi.MidiOut, including its message length check"""
+
+    def __init__(self):
+        self.sent = 0
+
+    def send_message(self, data):
+        # python-rtmidi refuses running status and anything but one message
+        if len(data) > 3 and data[0] != 0xF0:
+            raise ValueError("message longer than 3 bytes but does not start with 0xF0")
+        self.sent += 1
+
+
+class NullPort:
+    """Stands in for a mido rtmidi port: encodes the message, then writes it"""
+
+    def __init__(self):
+        self._rt = NullMidiOut()
+
+    def send(self, msg):
+        self._rt.send_message(msg.bytes())
+
+
+def bench(name, fn, events):
+    start = time.perf_counter()
+    fn(events)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<36} {elapsed / events * 1e9:8.0f} ns/event")
+    return elapsed
+
+
+def mido_notes(events):
+    port = NullPort()
+    for i in range(events):
+        note = 48 + i % 36
+        port.send(mido.Message('note_on', note=note, velocity=100))
+        port.send(mido.Message('note_off', note=note, velocity=0))
+
+
+def cached_notes(events):
+    write = NullPort()._rt.send_message
+    for i in range(events):
+        note = 48 + i % 36
+        write(NOTE_ON_BYTES[note])
+        write(NOTE_OFF_BYTES[note])
+
+
+def mido_cc(events):
+    port = NullPort()
+    for i in range(events):
+        port.send(mido.Message('control_change', control=3, value=i % 128))
+
+
+def cached_cc(events):
+    write = NullPort()._rt.send_message
+    cc_bytes = MESSAGES.cc(3)
+    for i in range(events):
+        write(cc_bytes[i % 128])
+
+
+def mido_chords(events):
+    # A two-note chord moving by a step: two note-offs, two note-ons
+    port = NullPort()
+    for i in range(events):
+        root = 48 + i % 24
+        for note in (root, root + 4):
+            port.send(mido.Message('note_off', note=note, velocity=0))
+        for note in (root + 2, root + 6):
+            port.send(mido.Message('note_on', note=note, velocity=100))
+
+
+def cached_chords(events):
+    port = NullPort()
+    sender = MidiSender(port)
+    for i in range(events):
+        root = 48 + i % 24
+        sender.send_raw(encode_note_batch((root, root + 4), (root + 2, root + 6)))
+    # Every batch must reach rtmidi as separate 3-byte messages
+    assert port._rt.sent == 4 * events, port._rt.sent
+
+
+def check_batches():
+    """Chord changes and the shutdown note-offs get through rtmidi's check"""
+    port = NullPort()
+    sender = MidiSender(port)
+    notes = NoteTracker()
+    for data in (encode_note_batch((), (60, 64, 67)), encode_note_batch((60, 64, 67), (62, 65, 69))):
+        notes.feed(data)
+        sender.send_raw(data)
+    sender.send_raw(notes.all_off())
+    assert port._rt.sent == 12, port._rt.sent
+    print("running-status batches split for rtmidi: ok")
+
+
+def mido_queued(events):
+    # What the sensor loop pays: build and queue, the worker isn't running
+    queue = MidiSender(None).open_queue('bench', maxsize=1024)
+    for i in range(events):
+        queue.send(mido.Message('note_on', note=48 + i % 36, velocity=100))
+
+
+def cached_queued(events):
+    queue = MidiSender(None).open_queue('bench', maxsize=1024)
+    for i in range(events):
+        queue.send_bytes(NOTE_ON_BYTES[48 + i % 36])
+
+
+def run(events):
+    check_batches()
+    print(f"{events} events per case")
+    for label, slow, fast in [("note on + off", mido_notes, cached_notes),
+                              ("control change", mido_cc, cached_cc),
+                              ("chord change", mido_chords, cached_chords),
+                              ("queue from sensor loop", mido_queued, cached_queued)]:
+        slow_time = bench(f"{label} (mido.Message)", slow, events)
+        fast_time = bench(f"{label} (cached bytes)", fast, events)
+        print(f"{'':<36} {slow_time / fast_time:8.1f}x faster")
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,51 @@
+import sys
+import time
+import mido
+from keymap import compile_scale_table
+from sensor import ReplayBackend, TouchScanner
+
+# Replays a recorded touch trace through touch -> note -> MIDI as fast as
+# possible, with no Pi, no UI and a port that drops everything.
+# Usage: python bench_pipeline.py touch/normalisation.txt [repeats]
+
+# Same mapping as 7-key.py
+note_table = compile_scale_table([60, 62, 64, 65, 67, 69, 71])
+
+
+class NullPort:
+    def __init__(self):
+        self.sent = 0
+
+    def send(self, msg):
+        self.sent += 1
+
+
+def run(path, repeats):
+    backend = ReplayBackend(path, realtime=False, loop=True)
+    scanner = TouchScanner(backend, poll_interval=0)
+    outport = NullPort()
+    last_note = None
+    ticks = 0
+    start = time.perf_counter()
+    while backend.loops < repeats:
+        mask = scanner.read_mask()
+        note = note_table[mask]
+        if note != last_note:
+            if last_note is not None:
+                outport.send(mido.Message('note_off', note=last_note, velocity=0))
+            if note is not None:
+                outport.send(mido.Message('note_on', note=note, velocity=100))
+            last_note = note
+        ticks += 1
+    elapsed = time.perf_counter() - start
+    trace_seconds = backend.duration * repeats
+    print(f"Replayed {ticks} samples ({trace_seconds:.1f} s of trace) in {elapsed:.3f} s")
+    print(f"{ticks / elapsed:.0f} samples/s, {trace_seconds / elapsed:.0f}x real time")
+    print(f"MIDI messages sent: {outport.sent}")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("Usage: python bench_pipeline.py <trace.csv> [repeats]")
+        sys.exit(1)
+    run(sys.argv[1], int(sys.argv[2]) if len(sys.argv) > 2 else 100)
@@ -0,0 +1,101 @@
+import sys
+import time
+from latency import LatencyHistogram
+from sensor import ALL_PINS_MASK, FRAME_STRUCT, ReplayBackend, TouchScanner
+from velocity import VelocityEstimator
+
+# How long the velocity burst holds back each note-on, for a few burst
+# shapes. Reads go to a replayed trace, stalled for as long as the same
+# read takes on an I2C bus at the given clock. Then the velocity the
+# default estimator gives each touch in the trace; record one at 1 kHz to
+# tune min_depth/max_depth for a set of pads.
+# Usage: python bench_velocity.py <trace.csv> [i2c_hz] [onsets]
+
+# Bytes on the wire per read: address, register, repeated start address, data
+STATUS_READ_BYTES = 3 + 2
+FRAME_READ_BYTES = 3 + FRAME_STRUCT.size
+BASELINE_READ_BYTES = 3 + 12
+
+BURSTS = [(2, 0.001), (3, 0.001), (4, 0.0005), (4, 0.001), (8, 0.001)]
+
+
+def spin(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+class BusDelay:
+    """Wraps a backend so each read takes as long as it would on the bus"""
+
+    def __init__(self, backend, hz):
+        self.backend = backend
+        self.address = backend.address
+        # 8 data bits plus ACK per byte
+        self.status_seconds = STATUS_READ_BYTES * 9 / hz
+        self.frame_seconds = FRAME_READ_BYTES * 9 / hz
+        self.baseline_seconds = BASELINE_READ_BYTES * 9 / hz
+
+    def now(self):
+        return self.backend.now()
+
+    def read_status(self):
+        spin(self.status_seconds)
+        return self.backend.read_status()
+
+    def read_filtered(self):
+        spin(self.frame_seconds)
+        return self.backend.read_filtered()
+
+    def read_baselines(self):
+        spin(self.baseline_seconds)
+        return self.backend.read_baselines()
+
+    def close(self):
+        self.backend.close()
+
+
+def run(path, hz, onsets):
+    scanner = TouchScanner(BusDelay(ReplayBackend(path, realtime=False, loop=True), hz), poll_interval=0)
+    print(f"I2C at {hz / 1000:.0f} kHz: status read {scanner.backend.status_seconds * 1e6:.0f} us, "
+          f"frame read {scanner.backend.frame_seconds * 1e6:.0f} us")
+    print(f"{'burst':<24} added before note-on, over {onsets} onsets")
+    print(f"{'none (fixed velocity)':<24} 0us")
+    for samples, interval in BURSTS:
+        estimator = VelocityEstimator(0b1, samples=samples, interval=interval)
+        added = LatencyHistogram()
+        for _ in range(onsets):
+            start = time.monotonic_ns()
+            estimator.burst(scanner, 0b1)
+            added.record(time.monotonic_ns() - start)
+        print(f"{f'{samples} reads, {interval * 1000:g} ms apart':<24} {added.summary()}")
+
+
+def velocities(path):
+    """Print the default estimator's velocity for every touch in a trace
+
+    Every read steps one row, so on a 1 kHz trace the status is polled
+    each millisecond and a burst sees what the MPR121 would show it.
+    """
+    backend = ReplayBackend(path, realtime=False)
+    scanner = TouchScanner(backend, poll_interval=0)
+    estimator = VelocityEstimator(ALL_PINS_MASK)
+    print("velocity per touch, default estimator:")
+    previous = 0
+    while not backend.finished:
+        mask = scanner.read_mask()
+        onsets = mask & ~previous
+        if onsets:
+            t = backend.times[backend.index]
+            pins = [pin for pin in range(12) if (onsets >> pin) & 1]
+            print(f"  {t:8.3f}s pins {pins}: {estimator.burst(scanner, onsets)}")
+        previous = mask
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("Usage: python bench_velocity.py <trace.csv> [i2c_hz] [onsets]")
+        sys.exit(1)
+    run(sys.argv[1], int(sys.argv[2]) if len(sys.argv) > 2 else 400000,
+        int(sys.argv[3]) if len(sys.argv) > 3 else 200)
+    velocities(sys.argv[1])
@@ -0,0 +1,55 @@
+"""Precomputed diatonic chords for every scale, degree and pitch offset"""
+
+# Chord shapes as scale steps above the root
+CHORD_SHAPES = {
+    'triad': (0, 2, 4),       # root, 3rd, 5th
+    'seventh': (0, 2, 4, 6),  # root, 3rd, 5th, 7th
+    'sus2': (0, 1, 4),        # root, 2nd, 5th
+    'sus4': (0, 3, 4),        # root, 4th, 5th
+}
+
+
+def build_chord(scale_notes, degree, steps, inversion=0, pitch_offset=0):
+    """Stack scale steps on a degree, moving up an octave when they wrap
+
+    Each inversion moves the lowest note up an octave.
+    """
+    size = len(scale_notes)
+    notes = []
+    for step in steps:
+        octave, idx = divmod(degree + step, size)
+        notes.append(scale_notes[idx] + 12 * octave + pitch_offset)
+    for _ in range(inversion):
+        notes.append(notes.pop(0) + 12)
+    return tuple(notes)
+
+
+class ChordTable:
+    """Every chord of every scale, built once when the scales are loaded
+
+    row() returns the chords for all degrees of one scale/shape/inversion at
+    one pitch offset, so the sensor loop picks a chord with row[degree].
+    Chords are immutable tuples and equal chords are the same object, so
+    a change can be detected with `is not` instead of comparing lists.
+    """
+
+    def __init__(self, scales, pitch_min=-12, pitch_max=12):
+        self.pitch_min = pitch_min
+        self.pitch_max = pitch_max
+        self.rows = {}
+        interned = {}
+        for scale_name, scale_notes in scales.items():
+            for shape, steps in CHORD_SHAPES.items():
+                for inversion in range(len(steps)):
+                    for offset in range(pitch_min, pitch_max + 1):
+                        row = []
+                        for degree in range(len(scale_notes)):
+                            notes = build_chord(scale_notes, degree, steps, inversion, offset)
+                            row.append(interned.setdefault(notes, notes))
+                        self.rows[(scale_name, shape, inversion, offset)] = tuple(row)
+
+    def row(self, scale_name, pitch_offset, shape='triad', inversion=0):
+        return self.rows[(scale_name, shape, inversion, pitch_offset)]
+
+    def chord(self, scale_name, degree, pitch_offset, shape='triad', inversion=0):
+        return self.rows[(scale_name, shape, inversion, pitch_offset)][degree]
@@ -0,0 +1,310 @@
+import time
+# Boot times below are measured from here
+BOOT_START = time.perf_counter()
+import os
+import mido
+import json
+import asyncio
+import argparse
+import importlib
+from aftertouch import Aftertouch
+from arpeggiator import Arpeggiator
+from baseline import load_profile, save_profile
+from chords import ChordTable
+from engine import Engine
+from latency import LatencyTracker
+from midi_clock import ClockFollower
+from midi_out import DEFAULT_VELOCITY, DROP_OLDEST, encode_note_batch
+from modes import MODES
+from sensor import TouchScanner, open_backend, open_irq
+from velocity import VelocityEstimator
+
+# Scale, chord, arp, free and single-pin modes in one app; switching modes swaps the
+# handler's strategy while the I2C bus and MIDI port stay open.
+# The sensor and MIDI come up first and notes play while Kivy is still
+# loading; the UI (cicada_ui.py) attaches to the running handler after.
+# Usage: python cicada.py [scale|chord|arp|free|single] [--headless] [--boot-time]
+
+# BCM pin wired to the MPR121 IRQ line, None to poll every 10 ms
+IRQ_GPIO = None
+
+# Setup MPR121 (or replay a trace from TOUCH_REPLAY)
+backend = open_backend()
+scanner = TouchScanner(backend, irq=open_irq(IRQ_GPIO, backend))
+
+# Touch-to-MIDI latency, dumped on exit or with kill -USR1
+latency = LatencyTracker()
+latency.install()
+
+# Load scales from JSON
+with open('scales.json', 'r') as f:
+    scales_data = json.load(f)
+
+available_scales = scales_data["C4_heptatonic_scales"]
+
+# Every chord of every scale, degree and pitch offset, built once
+chord_table = ChordTable(available_scales)
+
+# MIDI setup
+rtpmidi_port_name = 'rtpmidid:Network Export 128:0'
+try:
+    outport = mido.open_output(rtpmidi_port_name)
+except Exception as e:
+    outport = None
+    print(f"MIDI port not found: {e}")
+
+# Velocity from how hard each note pin is struck, or False for a fixed
+# DEFAULT_VELOCITY. The burst of reads adds ~4-5 ms before each note-on
+# (see bench_velocity.py, which also prints the velocity of every touch in
+# a trace for tuning). The curve exponent shapes soft vs hard playing; the
+# handler points it at the current mode's note pins
+VELOCITY = True
+velocity = VelocityEstimator(0, curve=1.0) if VELOCITY else None
+
+# Sensor, mapping, arpeggiator and MIDI output share one asyncio loop with
+# the UI; port writes happen on the engine's MIDI thread
+engine = Engine(scanner, outport, velocity=velocity)
+
+# Lock the arp to the DAW's MIDI clock on this input port, None to use the
+# tempo slider only
+clock_port_name = None
+clock = ClockFollower(clock_port_name)
+
+# Fraction of each arp step a note sounds
+ARP_GATE = 0.5
+
+DEFAULT_MODE = 'scale'
+
+# Pressure on held keys as aftertouch: 'poly', 'channel' or None for off
+AFTERTOUCH = 'poly'
+# Pressure reads per second while notes sound, and so the highest
+# aftertouch rate per note
+AFTERTOUCH_RATE = 50
+# Between notes the pads are read this often, to keep their baselines
+AFTERTOUCH_IDLE_SECONDS = 0.5
+
+# Arp tempo until the UI's slider (or a MIDI clock) sets it
+DEFAULT_TEMPO = 120
+
+# Kivy's own modules load on a worker thread while notes play; the window
+# itself is created when cicada_ui is imported on the main thread
+UI_PRELOAD = ('kivy.app', 'kivy.uix.widget', 'kivy.uix.button', 'kivy.uix.label',
+              'kivy.uix.slider', 'kivy.clock', 'kivy.graphics')
+
+class TouchSensorHandler:
+    def __init__(self, mode=DEFAULT_MODE):
+        self.current_scale = "Major_Ionian"
+        self.scales = available_scales
+        self.chord_table = chord_table
+        self.clock = clock
+        self.tempo = DEFAULT_TEMPO
+        self.chord_shape = 'triad'
+        self.chord_inversion = 0
+        self.pitch_offset = 0
+        # Velocity of the latest strike; notes changed without one keep it
+        self.velocity = DEFAULT_VELOCITY
+        self.PITCH_MIN = -12
+        self.PITCH_MAX = 12
+        # Notes the handler has turned on, whatever the mode
+        self.sounding = ()
+        # Previous touch mask; only bits that change need any work
+        self.last_mask = 0
+        # One arpeggiator task for the whole session, fed by arp mode
+        self.arpeggiator = Arpeggiator(engine.midi, self.get_arpeggiator_tempo, gate=ARP_GATE, clock=clock)
+        # Every mode is built up front so switching is a swap
+        self.modes = {name: mode_class(self) for name, mode_class in MODES.items()}
+        # Calibrated from the profile the touch/ control tools share. Each
+        # value supersedes the last, so it gets a queue that drops rather
+        # than holding up note on/off behind a stalled port
+        self.aftertouch = None
+        if AFTERTOUCH and outport is not None:
+            pressure_out = engine.midi.open_queue('aftertouch', overflow=DROP_OLDEST)
+            self.aftertouch = Aftertouch(pressure_out, AFTERTOUCH,
+                                         profile=load_profile(scanner.backend.address))
+        self.mode = self.modes[mode]
+        self.rebuild_tables()
+        self.enter_mode()
+
+    def get_current_notes(self):
+        return available_scales[self.current_scale]
+
+    def set_scale(self, scale_name):
+        self.current_scale = scale_name
+        self.rebuild_tables()
+
+    def rebuild_tables(self):
+        self.mode.rebuild()
+        # Remap held keys even though the touch mask hasn't changed
+        self.dirty = True
+        engine.remap()
+
+    def get_arpeggiator_tempo(self):
+        return self.tempo
+
+    def get_pitch_offset(self):
+        return self.pitch_offset
+
+    def set_chord_shape(self, shape, inversion=0):
+        """Pick the chord voicing: triad, seventh, sus2 or sus4, plus inversion"""
+        self.chord_shape = shape
+        self.chord_inversion = inversion
+        self.rebuild_tables()
+        print(f"Chord shape: {shape}, inversion {inversion}")
+
+    def set_mode(self, name):
+        """Switch mode between two touch changes, turning the old notes off"""
+        if name == self.mode.name:
+            return
+        start = time.perf_counter()
+        self.mode.leave()
+        self.sound(())
+        self.mode = self.modes[name]
+        self.mode.rebuild()
+        self.enter_mode()
+        # Whatever is held plays in the new mode straight away
+        self.dirty = True
+        self.handle(self.last_mask, time.monotonic_ns())
+        print(f"Mode: {name} (switched in {(time.perf_counter() - start) * 1000:.2f} ms)")
+
+    def enter_mode(self):
+        # Only the new mode's note pins get a velocity burst; a control pin
+        # (pitch, chord) mustn't delay or restrike anything
+        if velocity is not None:
+            velocity.pins_mask = self.mode.key_mask
+        self.mode.enter()
+
+    async def run(self, masks):
+        """Mapping task: handles each touch change the engine's sensor task reads"""
+        while True:
+            item = await masks.get()
+            # None asks for a remap of the current touch state
+            mask, t_read, velocity = item if item is not None else (self.last_mask, time.monotonic_ns(), None)
+            try:
+                self.handle(mask, t_read, velocity)
+            except Exception as e:
+                print(f"Touch sensor error: {e}")
+
+    def handle(self, mask, t_read, velocity=None):
+        # Bits that flipped since the last change; nothing else needs work
+        changed = mask ^ self.last_mask
+        if not changed and not self.dirty:
+            return
+        if velocity is not None:
+            self.velocity = velocity
+        self.last_mask = mask
+        mode = self.mode
+        # Pitch up/down on the rising edge of the mode's pitch pins
+        pressed = changed & mask
+        if pressed & mode.pitch_up_bit:
+            if self.pitch_offset < self.PITCH_MAX:
+                self.pitch_offset += 1
+                self.rebuild_tables()
+                print(f"Pitch up: {self.pitch_offset}")
+        if pressed & mode.pitch_down_bit:
+            if self.pitch_offset > self.PITCH_MIN:
+                self.pitch_offset -= 1
+                self.rebuild_tables()
+                print(f"Pitch down: {self.pitch_offset}")
+        # Remap only when a pin the mode plays on changed, or the tables
+        # were rebuilt
+        if changed & mode.watch_mask or self.dirty:
+            self.dirty = False
+            notes = mode.notes_for(mask)
+            t_mapped = time.monotonic_ns()
+            if mode.play(notes) and outport is not None:
+                latency.record(t_read, t_mapped, time.monotonic_ns())
+
+    def sound(self, notes):
+        """Turn the sounding notes off and notes on, in one write"""
+        if notes == self.sounding:
+            return False
+        self.send_chord_change(self.sounding, notes)
+        self.sounding = notes
+        if notes and self.aftertouch is not None:
+            # Start reading pressure now rather than at the next idle read
+            engine.wake_frames()
+        if notes:
+            print(f"Notes On: {notes} (Velocity: {self.velocity}, Mode: {self.mode.name}, Scale: {self.current_scale}, Offset: {self.pitch_offset})")
+        return True
+
+    def send_chord_change(self, off_notes, on_notes):
+        """Note offs then note ons, written to the port as one packet"""
+        if (off_notes or on_notes) and outport is not None:
+            engine.midi.send_bytes(encode_note_batch(off_notes, on_notes, self.velocity))
+
+    def on_frame(self, frame, timestamp):
+        """Pressure frame from the engine: aftertouch for the sounding notes"""
+        self.aftertouch.update(frame, timestamp, self.last_mask & self.mode.key_mask, self.sounding)
+
+    def stop(self):
+        self.mode.leave()
+        self.sound(())
+        if self.aftertouch is not None:
+            print(self.aftertouch.stats())
+            if self.aftertouch.tracker.frames:
+                save_profile(scanner.backend.address, self.aftertouch.tracker)
+        self.arpeggiator.stop()
+        print(clock.stats())
+        clock.close()
+
+def boot_ms():
+    return (time.perf_counter() - BOOT_START) * 1000
+
+def preload_ui():
+    # Our flags are parsed already; Kivy would reject them
+    os.environ.setdefault('KIVY_NO_ARGS', '1')
+    for name in UI_PRELOAD:
+        importlib.import_module(name)
+
+async def load_ui():
+    """Import Kivy without stalling the mapping task, then return the app class"""
+    await asyncio.get_running_loop().run_in_executor(None, preload_ui)
+    from cicada_ui import CicadaApp
+    return CicadaApp
+
+async def main(mode=DEFAULT_MODE, headless=False, boot_time=False):
+    touch_handler = TouchSensorHandler(mode)
+    try:
+        # Sensor, mapping and arpeggiator first, so keys play during UI load
+        engine.start()
+        engine.spawn(touch_handler.run(engine.masks))
+        engine.spawn(touch_handler.arpeggiator.run())
+        if touch_handler.aftertouch is not None:
+            engine.spawn(engine.read_frames(touch_handler.on_frame, 1 / AFTERTOUCH_RATE,
+                                            AFTERTOUCH_IDLE_SECONDS, lambda: bool(touch_handler.sounding)))
+        await engine.ready.wait()
+        print(f"Boot: touch->MIDI live after {boot_ms():.0f} ms")
+        if headless:
+            if not boot_time:
+                # Play until Ctrl+C cancels us
+                await asyncio.Event().wait()
+            return
+        load_ui_start = time.perf_counter()
+        CicadaApp = await load_ui()
+        app = CicadaApp(touch_handler)
+
+        def ui_up(*args):
+            print(f"Boot: UI up after {boot_ms():.0f} ms "
+                  f"(Kivy loaded in {(time.perf_counter() - load_ui_start) * 1000:.0f} ms)")
+            if boot_time:
+                app.stop()
+        app.bind(on_start=ui_up)
+        # Kivy runs on the same loop as the engine
+        await app.async_run(async_lib='asyncio')
+    finally:
+        touch_handler.stop()
+        # Every note-off is written before the loop goes away
+        await engine.shutdown()
+
+def parse_args(argv=None, mode=DEFAULT_MODE):
+    parser = argparse.ArgumentParser(description="CICADA touch instrument")
+    parser.add_argument('mode', nargs='?', default=mode, choices=list(MODES))
+    parser.add_argument('--headless', action='store_true',
+                        help="sensor and MIDI only, without loading Kivy")
+    parser.add_argument('--boot-time', action='store_true',
+                        help="print how long boot took and exit")
+    return parser.parse_args(argv)
+
+if __name__ == '__main__':
+    args = parse_args()
+    asyncio.run(main(args.mode, args.headless, args.boot_time))
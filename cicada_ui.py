@@ -0,0 +1,206 @@
+"""Round-screen UI for cicada.py, imported only once notes are already playing
+
+Nothing here touches the sensor or the MIDI port: the widget reads and
+steers the TouchSensorHandler that cicada.py started before Kivy loaded.
+"""
+from kivy.app import App
+from kivy.uix.widget import Widget
+from kivy.uix.button import Button
+from kivy.uix.label import Label
+from kivy.uix.slider import Slider
+from kivy.core.window import Window
+from kivy.clock import Clock
+from kivy.graphics import Color, Line
+from chords import CHORD_SHAPES
+
+# Set window size for circular screen
+Window.size = (720, 720)
+
+MODE_HELP = {
+    'scale': "Pins 0-3 play the scale, Pins 7/8 shift pitch",
+    'chord': "Hold Pin 9 + Pins 0-3 for chords, Pins 7/8 shift pitch",
+    'arp': "Pins 0-3 (+ Pin 8 for chords) play, arpeggiated while Pin 9 is held; Pins 5/6 shift pitch",
+    'free': "Pins 0-3 and 7-9, alone or in pairs, play chromatic notes",
+    'single': "Pins 0-3 and 7-9 each play one note of the scale",
+}
+
+class CircularScaleWidget(Widget):
+    def __init__(self, touch_handler, **kwargs):
+        super().__init__(**kwargs)
+        # The handler is already playing; the widget only views and steers it
+        self.touch_handler = touch_handler
+        # Title (top center) - positioned manually
+        title = Label(
+            text="CICADA",
+            font_size=24,
+            color=(1, 1, 1, 1),
+            halign='center',
+            text_size=(400, None),
+            pos=(160, 600),  # Centered horizontally, near top
+            size_hint=(None, None),
+            size=(400, 40)
+        )
+        self.add_widget(title)
+        # Current scale display - positioned in upper middle
+        self.current_scale_label = Label(
+            text=f"Scale: {self.touch_handler.current_scale.replace('_', ' ')}",
+            font_size=18,
+            color=(1, 1, 1, 1),
+            halign='center',
+            text_size=(300, None),
+            pos=(210, 520),  # Centered horizontally
+            size_hint=(None, None),
+            size=(300, 30)
+        )
+        self.add_widget(self.current_scale_label)
+        # Mode buttons in a row under the scale
+        self.mode_buttons = {}
+        for i, mode_name in enumerate(touch_handler.modes):
+            btn = Button(
+                text=mode_name.capitalize(),
+                font_size=14,
+                pos=(130 + i * 120, 440),
+                size_hint=(None, None),
+                size=(100, 50)
+            )
+            btn.bind(on_press=lambda x, name=mode_name: self.select_mode(name))
+            self.add_widget(btn)
+            self.mode_buttons[mode_name] = btn
+        # Pitch offset display - positioned in center
+        self.pitch_offset_label = Label(
+            text=f"Octave: {self.touch_handler.pitch_offset}",
+            font_size=16,
+            color=(1, 1, 1, 1),
+            halign='center',
+            text_size=(200, None),
+            pos=(260, 380),  # Center of screen
+            size_hint=(None, None),
+            size=(200, 25)
+        )
+        self.add_widget(self.pitch_offset_label)
+        # Tempo slider for arpeggiator
+        self.tempo_label = Label(
+            text=f"Arp Tempo: {touch_handler.tempo} BPM",
+            font_size=16,
+            color=(1, 1, 1, 1),
+            halign='center',
+            text_size=(200, None),
+            pos=(260, 340),
+            size_hint=(None, None),
+            size=(200, 25)
+        )
+        self.add_widget(self.tempo_label)
+        self.tempo_slider = Slider(min=40, max=240, value=touch_handler.tempo, step=1, pos=(160, 300), size_hint=(None, None), size=(400, 40))
+        self.tempo_slider.bind(value=self.on_tempo_change)
+        self.add_widget(self.tempo_slider)
+        # Chord voicing for chord and arp modes: each press picks the next
+        self.chord_shape_button = Button(
+            font_size=14,
+            pos=(220, 220),
+            size_hint=(None, None),
+            size=(130, 50)
+        )
+        self.chord_shape_button.bind(on_press=lambda x: self.next_chord_shape())
+        self.add_widget(self.chord_shape_button)
+        self.inversion_button = Button(
+            font_size=14,
+            pos=(370, 220),
+            size_hint=(None, None),
+            size=(130, 50)
+        )
+        self.inversion_button.bind(on_press=lambda x: self.next_inversion())
+        self.add_widget(self.inversion_button)
+        self.show_chord_shape()
+        # Scale buttons positioned around the edge
+        scale_names = list(touch_handler.scales.keys())
+        button_positions = [
+            (10, 335),  # Left
+            (550, 335),  # Right
+            (280, 10),  # Bottom
+            (280, 660)   # Top
+        ]
+        for i, scale_name in enumerate(scale_names):
+            btn = Button(
+                text=scale_name.replace('_', ' '),
+                font_size=14,
+                background_color=(0.2, 0.4, 0.8, 1),
+                pos=button_positions[i],
+                size_hint=(None, None),
+                size=(160, 50)
+            )
+            btn.bind(on_press=lambda x, scale=scale_name: self.select_scale(scale))
+            self.add_widget(btn)
+        # Instructions for the current mode at the bottom
+        self.mode_info = Label(
+            text="",
+            font_size=14,
+            color=(0.8, 0.8, 0.8, 1),
+            halign='center',
+            text_size=(400, None),
+            pos=(160, 120),  # Bottom center
+            size_hint=(None, None),
+            size=(400, 30)
+        )
+        self.add_widget(self.mode_info)
+        self.show_mode()
+        # Schedule UI updates
+        Clock.schedule_interval(self.update_display, 0.1)
+
+    def select_mode(self, mode_name):
+        self.touch_handler.set_mode(mode_name)
+        self.show_mode()
+
+    def show_mode(self):
+        current = self.touch_handler.mode.name
+        for mode_name, btn in self.mode_buttons.items():
+            btn.background_color = (0.2, 0.8, 0.2, 1) if mode_name == current else (0.5, 0.5, 0.5, 1)
+        self.mode_info.text = MODE_HELP[current]
+
+    def select_scale(self, scale_name):
+        self.touch_handler.set_scale(scale_name)
+        self.current_scale_label.text = f"Scale: {scale_name.replace('_', ' ')}"
+        print(f"Scale changed to: {scale_name}")
+
+    def next_chord_shape(self):
+        handler = self.touch_handler
+        shapes = list(CHORD_SHAPES)
+        shape = shapes[(shapes.index(handler.chord_shape) + 1) % len(shapes)]
+        # A seventh has one more inversion than the three-note shapes
+        handler.set_chord_shape(shape, handler.chord_inversion % len(CHORD_SHAPES[shape]))
+        self.show_chord_shape()
+
+    def next_inversion(self):
+        handler = self.touch_handler
+        shape = handler.chord_shape
+        handler.set_chord_shape(shape, (handler.chord_inversion + 1) % len(CHORD_SHAPES[shape]))
+        self.show_chord_shape()
+
+    def show_chord_shape(self):
+        handler = self.touch_handler
+        self.chord_shape_button.text = f"Chord: {handler.chord_shape.capitalize()}"
+        self.inversion_button.text = f"Inversion: {handler.chord_inversion}"
+
+    def update_display(self, dt):
+        self.pitch_offset_label.text = f"Octave: {self.touch_handler.get_pitch_offset()}"
+        clock = self.touch_handler.clock
+        if clock.locked():
+            self.tempo_label.text = f"Arp Tempo: {clock.tempo():.1f} BPM (MIDI clock)"
+        else:
+            self.tempo_label.text = f"Arp Tempo: {int(self.tempo_slider.value)} BPM"
+
+    def on_tempo_change(self, instance, value):
+        self.touch_handler.tempo = int(value)
+
+    def on_size(self, *args):
+        self.canvas.before.clear()
+        with self.canvas.before:
+            Color(1, 1, 1, 1)
+            Line(circle=(360, 360, 360), width=3)
+
+class CicadaApp(App):
+    def __init__(self, touch_handler, **kwargs):
+        super().__init__(**kwargs)
+        self.touch_handler = touch_handler
+
+    def build(self):
+        return CircularScaleWidget(self.touch_handler)
@@ -0,0 +1,131 @@
+"""asyncio runtime: sensor, mapping, arpeggiator and MIDI output as tasks"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from midi_out import AsyncMidiSender
+
+
+class Engine:
+    """Runs the instrument's tasks on one event loop
+
+    The sensor task reads the MPR121 on a worker thread (the I2C read and
+    the IRQ wait block) and puts (mask, t_read, velocity) on `masks` only
+    when the touch state changed. velocity is None unless the engine has a
+    VelocityEstimator and a pin it watches was just touched. The mapping
+    task consumes them and queues MIDI on `midi`; the arpeggiator is
+    another task feeding the same sender. Kivy shares the loop through
+    App.async_run(), so nothing else sleeps on its own. shutdown() cancels
+    the producers first, then lets the sender flush, so every note-off
+    reaches the port before the process exits.
+
+    read_frames() is an optional task reading all 12 electrodes' filtered
+    data for pressure. It has its own thread, because in IRQ mode the
+    sensor thread sits in wait_mask() while keys are held and nothing
+    changes.
+    """
+
+    def __init__(self, scanner, port, velocity=None):
+        self.scanner = scanner
+        self.velocity = velocity
+        self.midi = AsyncMidiSender(port)
+        self.masks = asyncio.Queue()
+        self.tasks = []
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='sensor')
+        # Set once the sensor has been read and its state handed on
+        self.ready = asyncio.Event()
+        self.frame_executor = None
+        # Set to read the next frame now instead of after the idle interval
+        self.frame_wakeup = asyncio.Event()
+        self.started = False
+
+    def spawn(self, coro):
+        """Run a coroutine as one of the engine's tasks"""
+        task = asyncio.get_running_loop().create_task(coro)
+        self.tasks.append(task)
+        return task
+
+    def start(self):
+        if not self.started:
+            self.started = True
+            self.midi.start()
+            self.spawn(self.sense())
+        return self
+
+    def remap(self):
+        """Have the mapping task look at the current touch state again"""
+        self.masks.put_nowait(None)
+
+    def read_touch(self):
+        """Sensor thread: wait for the next touch state, plus a velocity burst on onsets"""
+        scanner = self.scanner
+        previous = scanner.last_mask
+        mask = scanner.wait_mask()
+        # Stamped before the burst, so touch->MIDI latency includes it
+        t_read = time.monotonic_ns()
+        velocity = None
+        if self.velocity is not None:
+            onsets = mask & ~previous & self.velocity.pins_mask
+            if onsets:
+                velocity = self.velocity.burst(scanner, onsets)
+        return mask, t_read, velocity
+
+    async def sense(self):
+        loop = asyncio.get_running_loop()
+        scanner = self.scanner
+        last_mask = None
+        while True:
+            try:
+                mask, t_read, velocity = await loop.run_in_executor(self.executor, self.read_touch)
+            except Exception as e:
+                print(f"Touch sensor error: {e}")
+                await asyncio.sleep(0.1)
+                continue
+            if not self.ready.is_set():
+                self.ready.set()
+            if mask == last_mask:
+                scanner.tick(idle=True)
+                continue
+            last_mask = mask
+            self.masks.put_nowait((mask, t_read, velocity))
+            scanner.tick()
+
+    def wake_frames(self):
+        """Have read_frames() read now, e.g. because a note just started"""
+        self.frame_wakeup.set()
+
+    async def read_frames(self, on_frame, interval, idle_interval, active):
+        """Task: pass (frame, timestamp) to on_frame every `interval` while
+        active() is true, and every `idle_interval` (or on wake_frames()) otherwise
+        """
+        loop = asyncio.get_running_loop()
+        if self.frame_executor is None:
+            self.frame_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='frames')
+        scanner = self.scanner
+        while True:
+            try:
+                timestamp, frame = await loop.run_in_executor(self.frame_executor, scanner.read_frame)
+                on_frame(frame, timestamp)
+            except Exception as e:
+                print(f"Touch sensor error: {e}")
+                await asyncio.sleep(0.1)
+                continue
+            self.frame_wakeup.clear()
+            try:
+                await asyncio.wait_for(self.frame_wakeup.wait(), interval if active() else idle_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def shutdown(self):
+        """Stop every task, then flush note-offs and release the sensor"""
+        for task in self.tasks:
+            task.cancel()
+        # Cancelled tasks queue their own note-offs on the way out
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+        await self.midi.close()
+        # Let a read in progress finish before closing the bus
+        self.executor.shutdown(wait=True)
+        if self.frame_executor is not None:
+            self.frame_executor.shutdown(wait=True)
+        print(self.scanner.stats())
+        self.scanner.close()
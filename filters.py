@@ -0,0 +1,409 @@
+"""Vectorized conditioning for all 12 electrodes at once
+
+The touch/ tools smooth pin 0 one Python float at a time. A FilterBank
+runs a chain of stages over a whole frame per call instead, with every
+stage's state in arrays allocated up front. Each stage takes its settings
+as a scalar (same for every channel) or one value per channel; a stage
+set to its neutral value (alpha 1, window 1, deadband 0) passes that
+channel through unchanged, so channels can use different chains.
+
+RunningMean, SlidingMedian and SlidingRange are the single-stream
+versions, for the tools that filter one value at a time.
+"""
+import heapq
+import math
+from collections import deque
+import numpy as np
+
+# One column per electrode
+CHANNELS = 12
+
+
+def per_channel(value, channels, dtype=np.float64):
+    """A scalar or a sequence of settings as one array entry per channel"""
+    return np.array(np.broadcast_to(value, (channels,)), dtype=dtype)
+
+
+class EMAStage:
+    """Exponential moving average; higher alpha = more responsive"""
+
+    def __init__(self, alpha):
+        self.alpha = alpha
+
+    def setup(self, channels):
+        self.alphas = per_channel(self.alpha, channels)
+        if np.any((self.alphas <= 0) | (self.alphas > 1)):
+            raise ValueError("EMA alpha must be in (0, 1]")
+        self.value = np.zeros(channels)
+        self.delta = np.zeros(channels)
+        self.primed = False
+
+    def reset(self):
+        self.primed = False
+
+    def process(self, x):
+        if not self.primed:
+            # First frame seeds the average, as exponential_smooth() does
+            self.value[:] = x
+            self.primed = True
+        else:
+            np.subtract(x, self.value, out=self.delta)
+            self.delta *= self.alphas
+            self.value += self.delta
+        return self.value
+
+
+class SMAStage:
+    """Moving average over the last `window` frames, kept as a running sum"""
+
+    def __init__(self, window):
+        self.window = window
+
+    def setup(self, channels):
+        self.windows = per_channel(self.window, channels, np.intp)
+        if np.any(self.windows < 1):
+            raise ValueError("SMA window must be at least 1")
+        self.size = int(self.windows.max())
+        # Ring of past frames, one row per frame
+        self.ring = np.zeros((self.size, channels))
+        self.sum = np.zeros(channels)
+        self.value = np.zeros(channels)
+        self.columns = np.arange(channels)
+        self.pos = 0
+        self.count = 0
+
+    def reset(self):
+        self.ring[:] = 0
+        self.sum[:] = 0
+        self.pos = 0
+        self.count = 0
+
+    def process(self, x):
+        # The sample leaving each channel's window; zero until it has filled
+        oldest = self.ring[(self.pos - self.windows) % self.size, self.columns]
+        self.sum += x
+        self.sum -= oldest
+        self.ring[self.pos] = x
+        self.pos = (self.pos + 1) % self.size
+        self.count += 1
+        # Average over what we have while a window is still filling
+        np.divide(self.sum, np.minimum(self.windows, self.count), out=self.value)
+        return self.value
+
+
+class MedianStage:
+    """Median of the last `window` frames; removes spikes"""
+
+    def __init__(self, window):
+        self.window = window
+
+    def setup(self, channels):
+        windows = per_channel(self.window, channels, np.intp)
+        if np.any(windows < 1):
+            raise ValueError("median window must be at least 1")
+        # Channels sharing a window share one ring, so each group is one
+        # np.median call
+        self.groups = []
+        for window in np.unique(windows):
+            columns = np.flatnonzero(windows == window)
+            self.groups.append((columns, np.zeros((int(window), len(columns)))))
+        self.value = np.zeros(channels)
+        self.pos = 0
+        self.count = 0
+
+    def reset(self):
+        self.pos = 0
+        self.count = 0
+
+    def process(self, x):
+        self.count += 1
+        for columns, ring in self.groups:
+            window = len(ring)
+            ring[self.pos % window] = x[columns]
+            n = min(self.count, window)
+            filled = ring if n == window else ring[:n]
+            # Partitioning around the middle is all a median needs
+            mid = n // 2
+            if n % 2:
+                self.value[columns] = np.partition(filled, mid, axis=0)[mid]
+            else:
+                part = np.partition(filled, (mid - 1, mid), axis=0)
+                self.value[columns] = (part[mid - 1] + part[mid]) / 2
+        self.pos += 1
+        return self.value
+
+
+class DeadbandStage:
+    """Hold the output until the input moves by at least `width`"""
+
+    def __init__(self, width):
+        self.width = width
+
+    def setup(self, channels):
+        self.widths = per_channel(self.width, channels)
+        self.value = np.zeros(channels)
+        self.delta = np.zeros(channels)
+        self.moved = np.zeros(channels, dtype=bool)
+        self.primed = False
+
+    def reset(self):
+        self.primed = False
+
+    def process(self, x):
+        if not self.primed:
+            self.value[:] = x
+            self.primed = True
+        else:
+            # Same test as apply_deadband(): changes below width are ignored
+            np.subtract(x, self.value, out=self.delta)
+            np.abs(self.delta, out=self.delta)
+            np.greater_equal(self.delta, self.widths, out=self.moved)
+            np.copyto(self.value, x, where=self.moved)
+        return self.value
+
+
+class ScaleStage:
+    """Clamp [in_min, in_max] and map it onto [out_min, out_max]
+
+    set_range() moves in_min and in_max between frames, e.g. from live
+    calibration. A channel with in_min == in_max outputs out_min,
+    as scale_value() does. Channels listed in `pins` are scaled; the rest
+    pass through.
+    """
+
+    def __init__(self, in_min, in_max, out_min=0, out_max=127, pins=None):
+        self.initial = (in_min, in_max, out_min, out_max)
+        self.pins = pins
+
+    def setup(self, channels):
+        in_min, in_max, out_min, out_max = self.initial
+        self.in_min = per_channel(in_min, channels)
+        self.in_max = per_channel(in_max, channels)
+        self.out_min = per_channel(out_min, channels)
+        self.out_max = per_channel(out_max, channels)
+        self.passthrough = np.ones(channels, dtype=bool)
+        self.passthrough[list(range(channels)) if self.pins is None else self.pins] = False
+        self.value = np.zeros(channels)
+        self.set_range(self.in_min, self.in_max)
+
+    def reset(self):
+        pass
+
+    def set_range(self, in_min, in_max):
+        self.in_min[:] = in_min
+        self.in_max[:] = in_max
+        # Everything that only changes with the range, so process() is
+        # five array operations
+        self.low = np.minimum(self.in_min, self.in_max)
+        self.high = np.maximum(self.in_min, self.in_max)
+        span = self.in_max - self.in_min
+        flat = span == 0
+        span[flat] = 1
+        self.gain = np.where(flat, 0, (self.out_max - self.out_min) / span)
+
+    def process(self, x):
+        np.clip(x, self.low, self.high, out=self.value)
+        self.value -= self.in_min
+        self.value *= self.gain
+        self.value += self.out_min
+        # Channels not being scaled keep their input
+        np.copyto(self.value, x, where=self.passthrough)
+        return self.value
+
+
+class FilterBank:
+    """Runs a chain of stages over one 12-channel frame per call
+
+    process() returns the bank's own output array, which the next call
+    overwrites; copy it if you keep it.
+    """
+
+    def __init__(self, stages, channels=CHANNELS):
+        self.stages = list(stages)
+        self.channels = channels
+        self.frame = np.zeros(channels)
+        self.output = np.zeros(channels)
+        for stage in self.stages:
+            stage.setup(channels)
+
+    def reset(self):
+        for stage in self.stages:
+            stage.reset()
+
+    def process(self, frame):
+        """Condition one frame (12 raw values) and return the filtered frame"""
+        x = self.frame
+        x[:] = frame
+        for stage in self.stages:
+            x = stage.process(x)
+        self.output[:] = x
+        return self.output
+
+
+def control_bank(touch_min, touch_max, alpha=0.4, deadband=2, out_min=0, out_max=127, channels=CHANNELS):
+    """touch_control.py's chain for every electrode: EMA, deadband, 0-127"""
+    return FilterBank([EMAStage(alpha), DeadbandStage(deadband),
+                       ScaleStage(touch_min, touch_max, out_min, out_max)], channels)
+
+
+class RunningMean:
+    """Moving average of the last `window` values in O(1) per value
+
+    Keeps a running sum instead of summing the window on every sample. The
+    sum is recomputed exactly once per window so float rounding can't
+    accumulate.
+    """
+
+    def __init__(self, window):
+        if window < 1:
+            raise ValueError("window must be at least 1")
+        self.window = window
+        self.values = deque()
+        self.sum = 0
+        self.since_resum = 0
+
+    def add(self, value):
+        """Add a value and return the mean of the window"""
+        values = self.values
+        values.append(value)
+        self.sum += value
+        if len(values) > self.window:
+            self.sum -= values.popleft()
+        self.since_resum += 1
+        if self.since_resum >= self.window:
+            self.sum = math.fsum(values)
+            self.since_resum = 0
+        return self.sum / len(values)
+
+
+class SlidingMedian:
+    """Median of the last `window` values in O(log n) per value
+
+    Two heaps hold the lower and upper half of the window. A value leaving
+    the window is only counted in `delayed` and dropped once it reaches the
+    top of its heap, so nothing is searched or re-sorted. Under a steady
+    drift, removed values can stay buried below the top, so the heaps are
+    rebuilt from the window once they hold twice its size; that happens at
+    most once per `window` values, O(log n) amortized.
+    """
+
+    def __init__(self, window):
+        if window < 1:
+            raise ValueError("window must be at least 1")
+        self.window = window
+        self.values = deque()
+        # Max-heap of the lower half (negated), min-heap of the upper half
+        self.low = []
+        self.high = []
+        # Live (not yet removed) entries in each heap
+        self.low_size = 0
+        self.high_size = 0
+        # value -> removals still pending in the heaps
+        self.delayed = {}
+
+    def add(self, value):
+        """Add a value and return the median of the window"""
+        self.values.append(value)
+        if not self.low or value <= -self.low[0]:
+            heapq.heappush(self.low, -value)
+            self.low_size += 1
+        else:
+            heapq.heappush(self.high, value)
+            self.high_size += 1
+        if len(self.values) > self.window:
+            self.remove(self.values.popleft())
+        self.balance()
+        if len(self.low) + len(self.high) > 2 * self.window:
+            self.rebuild()
+        return self.median()
+
+    def rebuild(self):
+        ordered = sorted(self.values)
+        half = (len(ordered) + 1) // 2
+        # A sorted list is already a valid heap
+        self.low = [-value for value in reversed(ordered[:half])]
+        self.high = ordered[half:]
+        self.low_size = len(self.low)
+        self.high_size = len(self.high)
+        self.delayed = {}
+
+    def remove(self, value):
+        self.delayed[value] = self.delayed.get(value, 0) + 1
+        if value <= -self.low[0]:
+            self.low_size -= 1
+            if value == -self.low[0]:
+                self.prune(self.low, -1)
+        else:
+            self.high_size -= 1
+            if value == self.high[0]:
+                self.prune(self.high, 1)
+
+    def prune(self, heap, sign):
+        """Pop removed values off the top of a heap"""
+        delayed = self.delayed
+        while heap:
+            value = sign * heap[0]
+            pending = delayed.get(value)
+            if not pending:
+                break
+            if pending == 1:
+                del delayed[value]
+            else:
+                delayed[value] = pending - 1
+            heapq.heappop(heap)
+
+    def balance(self):
+        # The lower half holds the extra value when the count is odd
+        if self.low_size > self.high_size + 1:
+            heapq.heappush(self.high, -heapq.heappop(self.low))
+            self.low_size -= 1
+            self.high_size += 1
+            self.prune(self.low, -1)
+        elif self.low_size < self.high_size:
+            heapq.heappush(self.low, -heapq.heappop(self.high))
+            self.high_size -= 1
+            self.low_size += 1
+            self.prune(self.high, 1)
+
+    def median(self):
+        if self.low_size > self.high_size:
+            return -self.low[0]
+        return (-self.low[0] + self.high[0]) / 2
+
+
+class SlidingRange:
+    """Minimum and maximum of the last `window` values, O(1) amortized
+
+    `lows` holds the values that can still become the minimum, increasing
+    from the front: a new value drops every larger one behind it, since
+    those leave the window first and can never be the minimum again.
+    `highs` does the same for the maximum. Each value is added and dropped
+    once.
+    """
+
+    def __init__(self, window):
+        if window < 1:
+            raise ValueError("window must be at least 1")
+        self.window = window
+        self.lows = deque()
+        self.highs = deque()
+        self.count = 0
+
+    def add(self, value):
+        """Add a value and return (min, max) of the window"""
+        n = self.count
+        lows = self.lows
+        highs = self.highs
+        while lows and lows[-1][1] >= value:
+            lows.pop()
+        lows.append((n, value))
+        while highs and highs[-1][1] <= value:
+            highs.pop()
+        highs.append((n, value))
+        # Only the front can have left the window, one value per add
+        if lows[0][0] <= n - self.window:
+            lows.popleft()
+        if highs[0][0] <= n - self.window:
+            highs.popleft()
+        self.count = n + 1
+        return lows[0][1], highs[0][1]
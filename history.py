@@ -0,0 +1,69 @@
+"""Fixed-size sample history behind the live plots
+
+The plots used to keep one deque of Python ints per pin and rebuild lists
+from them on every redraw. A RingHistory keeps the last `capacity` rows in
+arrays allocated once, one row of floats per sample. Each row is written
+twice, at i and i + capacity, so the newest `len` rows are always one
+contiguous slice: times(), series() and average() hand the line artists
+views of that slice, nothing is copied or rebuilt per frame.
+"""
+import numpy as np
+from filters import CHANNELS
+
+
+class RingHistory:
+    """The last `capacity` samples of `columns` series, plus group averages
+
+    groups is a list of column lists; the average of each group is worked
+    out once per sample, when the sample is appended, and kept alongside
+    the series.
+    """
+
+    def __init__(self, capacity, columns=CHANNELS, groups=()):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.columns = columns
+        # Rows of this matrix average one group each
+        self.weights = np.zeros((len(groups), columns))
+        for g, group in enumerate(groups):
+            self.weights[g, list(group)] = 1.0 / len(group)
+        # One series per row, so each series is contiguous in memory
+        self.time_data = np.zeros(2 * capacity)
+        self.value_data = np.zeros((columns, 2 * capacity))
+        self.average_data = np.zeros((len(groups), 2 * capacity))
+        self.head = 0
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, t, row):
+        """Add one sample: its time and one value per column"""
+        i = self.head
+        j = i + self.capacity
+        values = self.value_data
+        self.time_data[i] = self.time_data[j] = t
+        values[:, i] = row
+        values[:, j] = values[:, i]
+        if len(self.weights):
+            averages = self.average_data
+            averages[:, i] = self.weights @ values[:, i]
+            averages[:, j] = averages[:, i]
+        self.head = (i + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+
+    def span(self):
+        """Slice of the backing arrays holding the current window, oldest first"""
+        stop = self.head + self.capacity
+        return slice(stop - self.count, stop)
+
+    def times(self):
+        return self.time_data[self.span()]
+
+    def series(self, column):
+        return self.value_data[column, self.span()]
+
+    def average(self, group):
+        return self.average_data[group, self.span()]
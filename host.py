@@ -0,0 +1,184 @@
+import os
+import sys
+import time
+import mido
+import asyncio
+import resource
+import subprocess
+from engine import Engine
+from keymap import compile_scale_table
+from latency import LatencyTracker
+from midi_out import encode_note_batch
+from sensor import TouchScanner, open_backend, open_irq
+
+# The 7-key engine and the pinch CC controller in one process: one Python,
+# one Kivy, one MIDI port and one event loop instead of run_both.py's two
+# interpreters.
+# Usage: python host.py                  run both components
+#        python host.py --compare [secs] measure this against run_both.py
+
+# BCM pin wired to the MPR121 IRQ line, None to poll every 10 ms
+IRQ_GPIO = None
+
+# Same mapping as 7-key.py
+C_MAJOR = [60, 62, 64, 65, 67, 69, 71]
+
+# Same port as pinch_cc3.py
+rtpmidi_port_name = 'rtpmidid:Network Export 128:0'
+
+
+class KeyComponent:
+    """7-key.py as a task: keys on pins 0-3 -> C major, on the shared sender"""
+
+    def __init__(self, out, latency):
+        self.out = out
+        self.latency = latency
+        self.note_table = compile_scale_table(C_MAJOR)
+        self.last_note = None
+
+    async def run(self, masks):
+        while True:
+            item = await masks.get()
+            if item is None:
+                continue
+            mask, t_read, _ = item
+            note = self.note_table[mask]
+            t_mapped = time.monotonic_ns()
+            if note != self.last_note:
+                off_notes = () if self.last_note is None else (self.last_note,)
+                on_notes = () if note is None else (note,)
+                self.out.send_bytes(encode_note_batch(off_notes, on_notes))
+                self.latency.record(t_read, t_mapped, time.monotonic_ns())
+                if note is not None:
+                    print(f"Note On: {note}")
+                self.last_note = note
+
+    def stop(self):
+        # Ensure last note is turned off
+        if self.last_note is not None:
+            self.out.send_bytes(encode_note_batch((self.last_note,), ()))
+            self.last_note = None
+
+
+def usage_report():
+    """Peak RSS and CPU time of this process"""
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return (f"host: peak RSS {usage.ru_maxrss / 1024:.1f} MB, "
+            f"CPU {usage.ru_utime + usage.ru_stime:.2f} s")
+
+
+def host_app(out):
+    """The pinch controller's Kivy app, drawing on the shared sender
+
+    Kivy and pinch_cc3 (which sizes the window when imported) load here,
+    so --compare never opens a window of its own.
+    """
+    from kivy.app import App
+    from pinch_cc3 import PinchCCWidget
+
+    class HostApp(App):
+        def build(self):
+            return PinchCCWidget(out=out)
+
+    return HostApp()
+
+
+async def main():
+    try:
+        outport = mido.open_output(rtpmidi_port_name)
+    except Exception as e:
+        outport = None
+        print(f"MIDI port not found: {e}")
+    backend = open_backend()
+    engine = Engine(TouchScanner(backend, irq=open_irq(IRQ_GPIO, backend)), outport)
+    latency = LatencyTracker()
+    latency.install()
+    keys = KeyComponent(engine.midi, latency)
+    engine.start()
+    engine.spawn(keys.run(engine.masks))
+    try:
+        await host_app(engine.midi if outport is not None else None).async_run(async_lib='asyncio')
+    finally:
+        keys.stop()
+        await engine.shutdown()
+        print(usage_report())
+
+
+def process_tree(pid):
+    """pid and all its descendants, from the ppid field in /proc/*/stat"""
+    parents = {}
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                with open(f'/proc/{entry}/stat') as f:
+                    fields = f.read().rsplit(')', 1)[1].split()
+                parents.setdefault(int(fields[1]), []).append(int(entry))
+            except OSError:
+                pass
+    tree = [pid]
+    for p in tree:
+        tree.extend(parents.get(p, []))
+    return tree
+
+
+def sample(pids):
+    """(total RSS in kB, total CPU seconds) of pids"""
+    rss_kb = 0
+    cpu_ticks = 0
+    for pid in pids:
+        try:
+            with open(f'/proc/{pid}/status') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        rss_kb += int(line.split()[1])
+            with open(f'/proc/{pid}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+            cpu_ticks += int(fields[11]) + int(fields[12])  # utime + stime
+        except OSError:
+            pass
+    return rss_kb, cpu_ticks / os.sysconf('SC_CLK_TCK')
+
+
+def measure(cmd, seconds):
+    """Run cmd for `seconds`, sampling its whole process tree every 100 ms"""
+    proc = subprocess.Popen(cmd)
+    start = time.monotonic()
+    peak_rss = 0
+    cpu = 0.0
+    procs = 1
+    while time.monotonic() - start < seconds and proc.poll() is None:
+        pids = process_tree(proc.pid)
+        rss_kb, cpu_now = sample(pids)
+        peak_rss = max(peak_rss, rss_kb)
+        # CPU is cumulative per process, so keep the highest total seen
+        cpu = max(cpu, cpu_now)
+        procs = max(procs, len(pids))
+        time.sleep(0.1)
+    for pid in reversed(process_tree(proc.pid)):
+        try:
+            os.kill(pid, 15)
+        except OSError:
+            pass
+    proc.wait()
+    return procs, peak_rss / 1024, cpu
+
+
+def compare(seconds):
+    here = os.path.dirname(os.path.abspath(__file__))
+    results = [
+        ("run_both.py (two interpreters)", measure([sys.executable, os.path.join(here, 'run_both.py')], seconds)),
+        ("host.py (one process)", measure([sys.executable, os.path.join(here, 'host.py')], seconds)),
+    ]
+    print(f"Over {seconds:.0f} s each:")
+    for name, (procs, rss_mb, cpu) in results:
+        print(f"  {name:<32} {procs} processes, peak RSS {rss_mb:.1f} MB, CPU {cpu:.2f} s")
+    (_, old_rss, old_cpu), (_, new_rss, new_cpu) = results[0][1], results[1][1]
+    if old_rss and old_cpu:
+        print(f"  host.py uses {new_rss / old_rss:.0%} of the memory and {new_cpu / old_cpu:.0%} of the CPU")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--compare':
+        compare(float(sys.argv[2]) if len(sys.argv) > 2 else 10)
+    else:
+        asyncio.run(main())
@@ -0,0 +1,75 @@
+"""Precompiled touch mask -> note lookup tables
+
+Every table has one entry per 12-bit touch mask, so the sensor loop maps a
+touch with a single index (`table[mask]`) instead of building a tuple and
+hashing it. Entries are a MIDI note, a scale degree or None for nothing.
+Tables are rebuilt only when the scale or pitch offset changes.
+"""
+from itertools import combinations
+
+# One entry per touch mask
+TABLE_SIZE = 4096
+
+# Pins 0-3 are the keys
+KEY_PINS_MASK = 0b1111
+
+# Touch combination on pins 0-3 -> scale index 0-6 (same as 7-key.py)
+KEY_COMBOS = {
+    0b0001: 0,  # 0 -> scale[0] (first note)
+    0b0010: 1,  # 1 -> scale[1] (second note)
+    0b0100: 2,  # 2 -> scale[2] (third note)
+    0b1000: 3,  # 3 -> scale[3] (fourth note)
+    0b0011: 4,  # 0+1 -> scale[4] (fifth note)
+    0b0110: 5,  # 1+2 -> scale[5] (sixth note)
+    0b1100: 6,  # 2+3 -> scale[6] (seventh note)
+}
+
+
+def compile_degree_table():
+    """Touch mask -> scale index, ignoring the non-key pins"""
+    return tuple(KEY_COMBOS.get(mask & KEY_PINS_MASK) for mask in range(TABLE_SIZE))
+
+
+# Scale degrees don't depend on the scale, so this one is built once
+DEGREE_TABLE = compile_degree_table()
+
+
+def compile_scale_table(scale_notes, pitch_offset=0):
+    """Touch mask -> note in scale_notes, shifted by pitch_offset"""
+    return tuple(None if degree is None else scale_notes[degree] + pitch_offset
+                 for degree in DEGREE_TABLE)
+
+
+def pressed_pins(mask, pins):
+    return [pin for pin in pins if (mask >> pin) & 1]
+
+
+def compile_free_table(note_pins, first_note=60):
+    """Touch mask -> chromatic note for every single and double pin combination
+
+    Combos are numbered in the order itertools.combinations yields them,
+    starting from first_note, as free mode always has.
+    """
+    combos = []
+    for n in [1, 2]:
+        combos.extend(combinations(note_pins, n))
+    combo_to_note = {combo: first_note + i for i, combo in enumerate(combos)}
+    table = []
+    for mask in range(TABLE_SIZE):
+        pins = pressed_pins(mask, note_pins)
+        table.append(combo_to_note.get(tuple(sorted(pins))) if 1 <= len(pins) <= 2 else None)
+    return tuple(table)
+
+
+def compile_single_pin_table(note_pins, scale_notes):
+    """Touch mask -> scale_notes[i] when only note_pins[i] is touched"""
+    table = []
+    for mask in range(TABLE_SIZE):
+        pins = pressed_pins(mask, note_pins)
+        note = None
+        if len(pins) == 1:
+            idx = note_pins.index(pins[0])
+            if idx < len(scale_notes):
+                note = scale_notes[idx]
+        table.append(note)
+    return tuple(table)
@@ -0,0 +1,99 @@
+"""Low-overhead latency histograms for the touch -> MIDI path"""
+import atexit
+import signal
+
+# Values below 16 us get their own bucket; above that every power of two is
+# split into 16 buckets, so any recorded value is within ~6% of its bucket.
+SUB_BUCKETS = 16
+NUM_BUCKETS = 33 * SUB_BUCKETS
+
+
+def bucket_index(us):
+    if us < SUB_BUCKETS:
+        return us
+    shift = us.bit_length() - 5
+    return min((shift + 1) * SUB_BUCKETS + ((us >> shift) & 15), NUM_BUCKETS - 1)
+
+
+def bucket_value(index):
+    """Lower bound in microseconds of a bucket"""
+    if index < SUB_BUCKETS:
+        return index
+    shift = index // SUB_BUCKETS - 1
+    return (SUB_BUCKETS + index % SUB_BUCKETS) << shift
+
+
+class LatencyHistogram:
+    """Counts latencies in fixed log-linear buckets
+
+    record() is one integer division, one bucket lookup and two adds, with
+    no allocation, so it is cheap enough for the sensor loop.
+    """
+
+    def __init__(self):
+        self.counts = [0] * NUM_BUCKETS
+        self.count = 0
+        self.max_ns = 0
+
+    def record(self, ns):
+        self.counts[bucket_index(ns // 1000)] += 1
+        self.count += 1
+        if ns > self.max_ns:
+            self.max_ns = ns
+
+    def percentile(self, p):
+        """Latency in microseconds below which p percent of samples fall"""
+        if self.count == 0:
+            return 0
+        target = self.count * p / 100
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if n and seen >= target:
+                return bucket_value(index)
+        return self.max_ns // 1000
+
+    def summary(self):
+        return (f"n={self.count} p50={self.percentile(50)}us p95={self.percentile(95)}us "
+                f"p99={self.percentile(99)}us max={self.max_ns // 1000}us")
+
+
+class LatencyTracker:
+    """Per-stage histograms fed from monotonic_ns timestamps
+
+    The sensor loop takes a timestamp right after the sensor read, after
+    mapping the touch to notes, and after the last send of the event, then
+    calls record(t_read, t_mapped, t_sent) once per MIDI event. When the loop
+    sends through a MidiSender, t_sent is when the message was queued and
+    the sender's own queue->sent histogram covers the port write.
+    """
+
+    STAGES = ('read->mapped', 'mapped->sent', 'read->sent')
+
+    def __init__(self, name="touch->MIDI"):
+        self.name = name
+        self.histograms = {stage: LatencyHistogram() for stage in self.STAGES}
+        self._mapped = self.histograms['read->mapped']
+        self._sent = self.histograms['mapped->sent']
+        self._total = self.histograms['read->sent']
+
+    def record(self, t_read, t_mapped, t_sent):
+        self._mapped.record(t_mapped - t_read)
+        self._sent.record(t_sent - t_mapped)
+        self._total.record(t_sent - t_read)
+
+    def report(self):
+        lines = [f"{self.name} latency:"]
+        for stage in self.STAGES:
+            lines.append(f"  {stage:13} {self.histograms[stage].summary()}")
+        return "\n".join(lines)
+
+    def dump(self, *args):
+        print(self.report())
+
+    def install(self, sig=signal.SIGUSR1):
+        """Dump on exit, and whenever the process gets sig (kill -USR1 <pid>)"""
+        atexit.register(self.dump)
+        if sig is not None:
+            signal.signal(sig, self.dump)
+
@@ -0,0 +1,199 @@
+"""Follow an external 24 ppqn MIDI clock (e.g. the DAW over rtpmidi)"""
+import math
+import random
+import sys
+import time
+import mido
+from latency import LatencyHistogram
+
+PPQN = 24
+# Ticks to see after Start before the tempo estimate is trusted
+LOCK_TICKS = 12
+# A gap this long means the clock stopped without a Stop message
+MAX_TICK_GAP_NS = 250_000_000
+# Consecutive ticks more than half a tick off before the loop re-seeds
+MAX_OUTLIERS = 3
+
+
+class ClockFollower:
+    """Tempo and phase of an incoming MIDI clock, filtered for network jitter
+
+    Tick arrival times go through a delay-locked loop (a second order PLL):
+    each tick moves the predicted tick time and the tick period a little
+    towards what was measured, so single late or early packets barely move
+    the grid. bandwidth (Hz) trades jitter rejection against how fast a
+    tempo change is followed. The filtered state is one tuple
+    (tick, time_ns, period_ns) replaced whole, so other threads always read
+    a consistent snapshot.
+    """
+
+    def __init__(self, port_name=None, bandwidth=0.5):
+        self.bandwidth = bandwidth
+        self.port = None
+        self.playing = False
+        self.starts = 0       # bumped on every Start, so followers can re-align
+        self.next_tick = 0    # index of the next clock tick since Start
+        self.last_arrival = None
+        self.state = None
+        self.outliers = 0
+        # Distance between measured and predicted tick times
+        self.phase_error = LatencyHistogram()
+        if port_name is not None:
+            try:
+                self.port = mido.open_input(port_name, callback=self.on_message)
+            except Exception as e:
+                print(f"MIDI clock input not found: {e}")
+
+    def close(self):
+        if self.port is not None:
+            self.port.close()
+            self.port = None
+
+    def on_message(self, msg, t=None):
+        if t is None:
+            t = time.monotonic_ns()
+        if msg.type == 'clock':
+            self.tick(t)
+        elif msg.type == 'start':
+            self.starts += 1
+            self.next_tick = 0
+            self.state = None
+            self.last_arrival = None
+            self.playing = True
+        elif msg.type == 'continue':
+            self.playing = True
+        elif msg.type == 'stop':
+            self.playing = False
+        elif msg.type == 'songpos':
+            # Song position is counted in 16ths, six ticks each
+            self.next_tick = msg.pos * 6
+            self.state = None
+            self.last_arrival = None
+
+    def tick(self, t):
+        n = self.next_tick
+        self.next_tick += 1
+        last = self.last_arrival
+        self.last_arrival = t
+        state = self.state
+        if last is None or t - last > MAX_TICK_GAP_NS:
+            # First tick, or the clock paused: keep the old period if any
+            self.state = (n, t, state[2] if state else None)
+            return
+        if state is None or state[2] is None:
+            self.state = (n, t, t - last)
+            return
+        _, t_tick, period = state
+        predicted = t_tick + period * (n - state[0])
+        error = t - predicted
+        if abs(error) > period / 2:
+            # A stalled packet is ignored; several in a row are a tempo jump
+            # or dropout, so re-seed instead of slewing there slowly
+            self.outliers += 1
+            if self.outliers >= MAX_OUTLIERS:
+                self.outliers = 0
+                self.state = (n, t, t - last)
+            return
+        self.outliers = 0
+        self.phase_error.record(int(abs(error)))
+        omega = 2 * math.pi * self.bandwidth * period / 1e9
+        self.state = (n, predicted + math.sqrt(2) * omega * error,
+                      period + omega * omega * error)
+
+    def locked(self):
+        state = self.state
+        return (self.playing and state is not None and state[2] is not None
+                and self.next_tick >= LOCK_TICKS)
+
+    def tempo(self):
+        """Filtered tempo in BPM, None before the first two ticks"""
+        state = self.state
+        if state is None or not state[2]:
+            return None
+        return 60e9 / (state[2] * PPQN)
+
+    def tick_time(self, n):
+        """Predicted monotonic_ns of tick n"""
+        tick, t_tick, period = self.state
+        return t_tick + (n - tick) * period
+
+    def next_step(self, ticks_per_step, now, after=None):
+        """(tick, time_ns, step_ns) of the next step on the clock's grid
+
+        Steps fall on every ticks_per_step-th tick since Start; the first
+        one not before now (and after the tick `after`, if given) is
+        returned. None while the clock isn't locked.
+        """
+        state = self.state
+        if not self.locked():
+            return None
+        tick, t_tick, period = state
+        n = tick + max(0, math.ceil((now - t_tick) / period))
+        n = -(-n // ticks_per_step) * ticks_per_step
+        if after is not None and n <= after:
+            n = after + ticks_per_step
+        return n, int(t_tick + (n - tick) * period), int(period * ticks_per_step)
+
+    def stats(self):
+        tempo = self.tempo()
+        tempo_text = "-" if tempo is None else f"{tempo:.2f}"
+        return f"MIDI clock: tempo={tempo_text} BPM ticks={self.next_tick} phase error {self.phase_error.summary()}"
+
+
+# Jittery clocks the follower must lock to: (BPM, jitter in ms)
+SCENARIOS = [(120.0, 2.0), (90.0, 5.0), (174.0, 1.0)]
+# Largest tempo error, in BPM, a simulation passes with
+MAX_TEMPO_ERROR = 0.5
+
+
+def simulate(bpm=120.0, jitter_ms=2.0, seconds=20, seed=1):
+    """Feed a clock with network-like jitter; True if the follower tracked it
+
+    The estimated tempo must be within MAX_TEMPO_ERROR of the real one,
+    and the filtered tick times must spread less than half as much as the
+    raw arrivals do.
+    """
+    rng = random.Random(seed)
+    follower = ClockFollower()
+    period = 60e9 / (bpm * PPQN)
+    follower.on_message(mido.Message('start'), 0)
+    raw = []
+    filtered = []
+    for n in range(int(seconds * bpm / 60 * PPQN)):
+        ideal = n * period
+        # Packets are only ever delayed, with an occasional long stall
+        delay = abs(rng.gauss(0, jitter_ms * 1e6))
+        if rng.random() < 0.01:
+            delay += 4 * jitter_ms * 1e6
+        follower.on_message(mido.Message('clock'), int(ideal + delay))
+        if n >= 4 * PPQN:
+            # Offsets from the ideal grid, once the loop has settled
+            raw.append(delay)
+            filtered.append(follower.tick_time(n) - ideal)
+    tempo = follower.tempo()
+    raw_spread = max(raw) - min(raw)
+    filtered_spread = max(filtered) - min(filtered)
+    print(f"Simulated {bpm} BPM with {jitter_ms} ms jitter for {seconds} s")
+    print(f"Estimated tempo: {tempo:.3f} BPM (error {tempo - bpm:+.3f})")
+    print(f"Tick offset spread (max - min): raw {raw_spread / 1e6:.3f} ms, "
+          f"filtered {filtered_spread / 1e6:.3f} ms")
+    print(follower.stats())
+    ok = True
+    if abs(tempo - bpm) >= MAX_TEMPO_ERROR:
+        print(f"FAIL: tempo off by more than {MAX_TEMPO_ERROR} BPM")
+        ok = False
+    if filtered_spread >= raw_spread / 2:
+        print("FAIL: filtered spread not below half the raw spread")
+        ok = False
+    return ok
+
+
+if __name__ == '__main__':
+    # Usage: python midi_clock.py [bpm] [jitter_ms]
+    # Exits non-zero if the follower loses any of the simulated clocks
+    if len(sys.argv) > 1:
+        scenarios = [(float(sys.argv[1]), float(sys.argv[2]) if len(sys.argv) > 2 else 2.0)]
+    else:
+        scenarios = SCENARIOS
+    results = [simulate(bpm, jitter_ms) for bpm, jitter_ms in scenarios]
+    sys.exit(0 if all(results) else 1)
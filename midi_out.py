@@ -0,0 +1,416 @@
+"""MIDI output worker: one thread owns the port, the loops only queue"""
+import asyncio
+import threading
+import time
+from collections import deque
+import mido
+from latency import LatencyHistogram
+
+# What a full queue does with a new message
+DROP_OLDEST = 'drop_oldest'  # make room by discarding the oldest message
+DROP_NEWEST = 'drop_newest'  # discard the new message
+BLOCK = 'block'              # wait for the worker to make room
+OVERFLOW_POLICIES = (DROP_OLDEST, DROP_NEWEST, BLOCK)
+
+NOTE_OFF = 0x80
+NOTE_ON = 0x90
+POLY_AFTERTOUCH = 0xA0
+CONTROL_CHANGE = 0xB0
+CHANNEL_PRESSURE = 0xD0
+DEFAULT_VELOCITY = 100
+
+
+class MessageCache:
+    """Pre-encoded MIDI messages, indexed instead of built per event
+
+    note_on[channel][note] and note_off[channel][note] hold the bytes for
+    all 128 notes on all 16 channels. Controller rows (all 128 values of one
+    CC on one channel) are encoded the first time cc() asks for them, and
+    so are the aftertouch rows.
+    Everything here can go straight to MidiQueue.send_bytes().
+    """
+
+    def __init__(self, velocity=DEFAULT_VELOCITY):
+        self.velocity = velocity
+        self.note_on = tuple(tuple(bytes((NOTE_ON | channel, note, velocity)) for note in range(128))
+                             for channel in range(16))
+        self.note_off = tuple(tuple(bytes((NOTE_OFF | channel, note, 0)) for note in range(128))
+                              for channel in range(16))
+        self.cc_rows = {}
+        self.pressure_rows = {}
+
+    def cc(self, control, channel=0):
+        """Bytes for every value of one controller: cc(3)[value]"""
+        row = self.cc_rows.get((channel, control))
+        if row is None:
+            row = tuple(bytes((CONTROL_CHANGE | channel, control, value)) for value in range(128))
+            self.cc_rows[(channel, control)] = row
+        return row
+
+    def poly_aftertouch(self, note, channel=0):
+        """Bytes for every pressure value on one note: poly_aftertouch(60)[value]"""
+        row = self.pressure_rows.get((channel, note))
+        if row is None:
+            row = tuple(bytes((POLY_AFTERTOUCH | channel, note, value)) for value in range(128))
+            self.pressure_rows[(channel, note)] = row
+        return row
+
+    def channel_pressure(self, channel=0):
+        """Bytes for every channel pressure value: channel_pressure()[value]"""
+        row = self.pressure_rows.get((channel, None))
+        if row is None:
+            row = tuple(bytes((CHANNEL_PRESSURE | channel, value)) for value in range(128))
+            self.pressure_rows[(channel, None)] = row
+        return row
+
+
+# Shared cache; the apps all play on MIDI channel 1
+MESSAGES = MessageCache()
+NOTE_ON_BYTES = MESSAGES.note_on[0]
+NOTE_OFF_BYTES = MESSAGES.note_off[0]
+
+
+def encode_note_batch(off_notes=(), on_notes=(), velocity=DEFAULT_VELOCITY, channel=0):
+    """A chord change as one running-status byte string: note-offs, then note-ons
+
+    Note-offs are written as note-on with velocity 0, so the whole batch
+    shares a single status byte. A stream port takes it in one write;
+    rtmidi gets it as back-to-back 3-byte messages (see MidiSender.send_raw).
+    """
+    data = bytearray((NOTE_ON | channel,))
+    for note in off_notes:
+        data += bytes((note, 0))
+    for note in on_notes:
+        data += bytes((note, velocity))
+    return bytes(data)
+
+
+def split_messages(data):
+    """The complete messages in a byte string that may use running status
+
+    Each channel message comes back with its status byte. A single message
+    or a sysex is returned as it is.
+    """
+    if len(data) <= 3 or data[0] == 0xF0:
+        return (data,)
+    status = data[0]
+    if status & 0xF0 not in (0xC0, 0xD0) and max(data[1:]) < 0x80:
+        # One status byte for the whole batch, as encode_note_batch writes it
+        head = data[:1]
+        return [head + data[i:i + 2] for i in range(1, len(data), 2)]
+    messages = []
+    status = 0
+    i = 0
+    while i < len(data):
+        byte = data[i]
+        if byte >= 0xF8:
+            # Realtime messages can appear anywhere and are one byte
+            messages.append(data[i:i + 1])
+            i += 1
+            continue
+        if byte & 0x80:
+            status = byte
+            i += 1
+        size = 1 if status & 0xF0 in (0xC0, 0xD0) else 2
+        messages.append(bytes((status,)) + data[i:i + size])
+        i += size
+    return messages
+
+
+def raw_writers(port):
+    """(write_stream, write_message) for the port's raw paths, either may be None
+
+    write_stream takes any byte string, running status included, in one
+    call. Only a file-like port has one, such as a raw MIDI device node
+    opened with open('/dev/snd/midiC1D0', 'wb', buffering=0).
+
+    write_message takes one complete message. python-rtmidi's
+    MidiOut.send_message raises ValueError on anything longer than 3 bytes
+    that isn't a sysex, so batches have to be split for it. It works for a
+    MidiOut (as in midi.py) and for a mido port on the rtmidi backend, which
+    keeps its MidiOut in `_rt`.
+    """
+    rt = getattr(port, '_rt', port)
+    return getattr(port, 'write', None), getattr(rt, 'send_message', None)
+
+
+class NoteTracker:
+    """Which notes are sounding, read from the raw bytes going out"""
+
+    def __init__(self):
+        self.sounding = set()  # (channel, note)
+        self.status = 0
+        self.pending = []
+
+    def feed(self, data):
+        for byte in data:
+            if byte >= 0xF8:
+                continue  # realtime messages can appear anywhere
+            if byte & 0x80:
+                self.status = byte
+                self.pending = []
+                continue
+            kind = self.status & 0xF0
+            if kind == 0xF0:
+                continue  # sysex and system common data
+            self.pending.append(byte)
+            if len(self.pending) < (1 if kind in (0xC0, 0xD0) else 2):
+                continue
+            if kind == NOTE_ON and self.pending[1] > 0:
+                self.sounding.add((self.status & 0x0F, self.pending[0]))
+            elif kind in (NOTE_ON, NOTE_OFF):
+                self.sounding.discard((self.status & 0x0F, self.pending[0]))
+            # Running status: the next data bytes reuse self.status
+            self.pending = []
+
+    def all_off(self):
+        """Note-offs for everything still sounding, as one byte string"""
+        data = b''
+        for channel in sorted({channel for channel, _ in self.sounding}):
+            notes = sorted(note for ch, note in self.sounding if ch == channel)
+            data += encode_note_batch(notes, (), channel=channel)
+        self.sounding.clear()
+        return data
+
+
+class MidiQueue:
+    """Bounded single-producer/single-consumer queue of MIDI messages
+
+    Each producer thread (sensor loop, arpeggiator, UI) gets its own queue,
+    so a deque append on one side and popleft on the other is all the
+    synchronisation needed; neither side ever takes a lock on the data.
+    """
+
+    def __init__(self, name, sender, maxsize, overflow):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        self.name = name
+        self.sender = sender
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.items = deque(maxlen=maxsize if overflow == DROP_OLDEST else None)
+        # Called on the worker thread each time it has emptied this queue
+        self.on_drain = None
+        # Metrics
+        self.queued = 0
+        self.dropped = 0
+        self.max_depth = 0
+
+    def send(self, msg):
+        """Queue a message for the worker; never touches the port"""
+        depth = len(self.items)
+        if depth >= self.maxsize:
+            if self.overflow == DROP_NEWEST:
+                self.dropped += 1
+                return
+            if self.overflow == DROP_OLDEST:
+                # deque(maxlen) discards the oldest on append
+                self.dropped += 1
+            else:
+                while len(self.items) >= self.maxsize and self.sender.running:
+                    time.sleep(0.0005)
+        self.items.append((msg, time.monotonic_ns()))
+        self.queued += 1
+        depth = len(self.items)
+        if depth > self.max_depth:
+            self.max_depth = depth
+        # The worker clears the flag before it drains, so if it's still set
+        # this message will be picked up without ringing again
+        wakeup = self.sender.wakeup
+        if not wakeup.is_set():
+            wakeup.set()
+
+    def send_bytes(self, data):
+        """Queue pre-encoded MIDI bytes, written to the port in one call"""
+        self.send(data)
+
+    def depth(self):
+        return len(self.items)
+
+    def stats(self):
+        return (f"{self.name}: queued={self.queued} dropped={self.dropped} "
+                f"depth={self.depth()} max_depth={self.max_depth}")
+
+
+class MidiSender:
+    """Owns the MIDI output port and sends everything from one thread
+
+    When rtpmidid or a Bluetooth link stalls, only this thread waits; the
+    sensor loop keeps sampling and its note-offs queue up behind it. A
+    port of None (no MIDI device found) just discards what it drains.
+    Queues block when full unless opened with a drop policy: dropping a
+    note-off would leave its note hanging, so only streams where the newest
+    value supersedes the rest (controllers) should drop.
+    """
+
+    def __init__(self, port, maxsize=256, overflow=BLOCK):
+        self.port = port
+        self.write_stream, self.write_message = raw_writers(port)
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.queues = []
+        self.wakeup = threading.Event()
+        self.running = False
+        self.thread = None
+        self.sent = 0
+        # Time from queueing a message to port.send returning
+        self.queue_latency = LatencyHistogram()
+
+    def open_queue(self, name, maxsize=None, overflow=None):
+        """A queue for one producer thread"""
+        queue = MidiQueue(name, self, maxsize or self.maxsize, overflow or self.overflow)
+        self.queues.append(queue)
+        return queue
+
+    def start(self):
+        if not self.running:
+            self.running = True
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+        return self
+
+    def drain(self):
+        for queue in self.queues:
+            items = queue.items
+            while items:
+                msg, t_queued = items.popleft()
+                if self.port is not None:
+                    try:
+                        if isinstance(msg, bytes):
+                            self.send_raw(msg)
+                        else:
+                            self.port.send(msg)
+                    except Exception as e:
+                        print(f"MIDI send error: {e}")
+                self.sent += 1
+                self.queue_latency.record(time.monotonic_ns() - t_queued)
+            if queue.on_drain is not None:
+                queue.on_drain()
+
+    def send_raw(self, data):
+        if self.write_stream is not None:
+            self.write_stream(data)
+        elif self.write_message is not None:
+            # rtmidi takes one message per call, so a batch goes out back-to-back
+            for msg in split_messages(data):
+                self.write_message(msg)
+        else:
+            # No raw path on this backend: one send per message
+            for msg in mido.parse_all(data):
+                self.port.send(msg)
+
+    def run(self):
+        while self.running:
+            self.wakeup.wait(0.1)
+            # Clear before draining so a message queued mid-drain rings again
+            self.wakeup.clear()
+            self.drain()
+        # Flush whatever is left (e.g. note-offs queued on shutdown)
+        self.drain()
+
+    def stop(self):
+        """Send everything still queued, then stop the worker"""
+        self.running = False
+        self.wakeup.set()
+        if self.thread is not None:
+            self.thread.join(timeout=1.0)
+        else:
+            self.drain()
+        print(self.stats())
+
+    def stats(self):
+        lines = [f"MIDI sender: sent={self.sent} queue->sent {self.queue_latency.summary()}"]
+        lines.extend(f"  {queue.stats()}" for queue in self.queues)
+        return "\n".join(lines)
+
+
+class AsyncMidiSender:
+    """The engine's MIDI output: tasks on the event loop queue, a MidiSender writes
+
+    Wraps a MidiSender with one bounded queue, so the engine gets the same
+    overflow policy and depth metrics as the threaded apps. send_bytes()
+    never touches the port and never waits: the sender's thread writes
+    everything queued since its last wakeup back-to-back, and once
+    `maxsize` messages are backed up behind a stalled port, further notes
+    wait in `backlog` on the loop until the thread has made room. Streams
+    where the newest value supersedes the rest get their own dropping
+    queue from open_queue(). close() writes what is still queued plus a
+    note-off for every note left sounding, so shutdown never leaves a hung
+    note.
+    """
+
+    def __init__(self, port, maxsize=256, overflow=BLOCK):
+        self.sender = MidiSender(port, maxsize, overflow)
+        self.queue = self.sender.open_queue('engine')
+        # Fed as messages are queued; only used for the shutdown note-offs
+        self.notes = NoteTracker()
+        # Messages held on the loop while the queue is full
+        self.backlog = deque()
+        self.room = asyncio.Event()
+        self.flusher = None
+        self.deferred = 0
+        self.max_backlog = 0
+
+    def open_queue(self, name, maxsize=None, overflow=DROP_OLDEST):
+        """Another queue to the same port, for values that supersede each other"""
+        if overflow == BLOCK:
+            raise ValueError("Only the engine queue may block; open this one with a drop policy")
+        return self.sender.open_queue(name, maxsize, overflow)
+
+    def send_bytes(self, data):
+        self.notes.feed(data)
+        queue = self.queue
+        if queue.overflow == BLOCK and (self.backlog or queue.depth() >= queue.maxsize):
+            # Waiting for room here would stall every task on the loop
+            self.backlog.append(data)
+            self.deferred += 1
+            if len(self.backlog) > self.max_backlog:
+                self.max_backlog = len(self.backlog)
+            if self.flusher is None:
+                self.flusher = asyncio.get_running_loop().create_task(self.flush_backlog())
+        else:
+            queue.send_bytes(data)
+
+    async def flush_backlog(self):
+        """Task: move the backlog into the queue as the sender's thread drains it"""
+        loop = asyncio.get_running_loop()
+        queue = self.queue
+        queue.on_drain = lambda: loop.call_soon_threadsafe(self.room.set)
+        try:
+            while self.backlog:
+                # Cleared before looking at the depth, so a drain from here
+                # on sets it again
+                self.room.clear()
+                while self.backlog and queue.depth() < queue.maxsize:
+                    queue.send_bytes(self.backlog.popleft())
+                if self.backlog:
+                    await self.room.wait()
+        finally:
+            queue.on_drain = None
+            self.flusher = None
+
+    def start(self):
+        self.sender.start()
+        return self
+
+    async def close(self):
+        if self.flusher is not None:
+            self.flusher.cancel()
+        offs = self.notes.all_off()
+        if offs:
+            self.backlog.append(offs)
+        # Waiting for room and for the worker to drain happens off the loop
+        await asyncio.get_running_loop().run_in_executor(None, self.finish)
+
+    def finish(self):
+        """Queue the rest of the backlog, then stop the sender"""
+        while self.backlog:
+            self.queue.send_bytes(self.backlog.popleft())
+        self.sender.stop()
+        print(self.backlog_stats())
+
+    def backlog_stats(self):
+        return f"  backlog: deferred={self.deferred} max={self.max_backlog}"
+
+    def stats(self):
+        return f"{self.sender.stats()}\n{self.backlog_stats()}"
@@ -0,0 +1,145 @@
+"""Touch -> note strategies for the unified instrument (cicada.py)
+
+A mode only decides which notes a touch mask should sound. The handler
+keeps everything the modes share (scale, pitch offset, chord voicing, the
+notes currently sounding), so switching modes swaps one object and turns
+the old notes off; no tables, ports or threads are rebuilt.
+
+Each mode keeps the control pins of the app it replaces: the scale and
+chord apps shift pitch on 7/8 (chord on 9), the arp app on 5/6 (chord
+on 8) and arpeggiates only while 9 is held.
+"""
+from keymap import DEGREE_TABLE, KEY_PINS_MASK, compile_free_table, compile_scale_table, compile_single_pin_table
+from sensor import pin_bit
+
+# The free and single modes play on these pins instead of keys 0-3
+FREE_NOTE_PINS = [0, 1, 2, 3, 7, 8, 9]
+FREE_NOTE_PINS_MASK = sum(pin_bit(pin) for pin in FREE_NOTE_PINS)
+
+
+def note_tuples(note_table):
+    """Touch mask -> () or (note,), so every mode hands back a tuple of notes"""
+    singles = {}
+    return tuple(() if note is None else singles.setdefault(note, (note,)) for note in note_table)
+
+
+class Mode:
+    name = None
+    # Pins whose changes can change the notes
+    watch_mask = 0
+    # Pins that select notes; their pressure is the notes' aftertouch
+    key_mask = 0
+    # Control pins, 0 where the mode has none
+    pitch_up_bit = 0
+    pitch_down_bit = 0
+    chord_bit = 0
+
+    def __init__(self, handler):
+        self.handler = handler
+
+    def rebuild(self):
+        """Recompile lookup tables after the scale, offset or voicing changed"""
+
+    def notes_for(self, mask):
+        return ()
+
+    def enter(self):
+        pass
+
+    def leave(self):
+        pass
+
+    def play(self, notes):
+        """Make notes the ones sounding; True if any MIDI was sent"""
+        return self.handler.sound(notes)
+
+
+class ScaleMode(Mode):
+    """Key combinations on pins 0-3 -> one note of the current scale"""
+    name = 'scale'
+    watch_mask = KEY_PINS_MASK
+    key_mask = KEY_PINS_MASK
+    pitch_up_bit = pin_bit(7)
+    pitch_down_bit = pin_bit(8)
+
+    def rebuild(self):
+        handler = self.handler
+        self.note_table = note_tuples(compile_scale_table(handler.get_current_notes(), handler.pitch_offset))
+
+    def notes_for(self, mask):
+        return self.note_table[mask]
+
+
+class ChordMode(ScaleMode):
+    """Scale notes, or the diatonic chord on the key's degree while pin 9 is held"""
+    name = 'chord'
+    chord_bit = pin_bit(9)
+    watch_mask = KEY_PINS_MASK | chord_bit
+
+    def rebuild(self):
+        super().rebuild()
+        handler = self.handler
+        self.chord_row = handler.chord_table.row(handler.current_scale, handler.pitch_offset,
+                                                 handler.chord_shape, handler.chord_inversion)
+
+    def notes_for(self, mask):
+        if mask & self.chord_bit:
+            degree = DEGREE_TABLE[mask]
+            return () if degree is None else self.chord_row[degree]
+        return self.note_table[mask]
+
+
+class ArpMode(ChordMode):
+    """Chord mode's notes, played directly or by the arpeggiator while pin 9 is held"""
+    name = 'arp'
+    pitch_up_bit = pin_bit(5)
+    pitch_down_bit = pin_bit(6)
+    chord_bit = pin_bit(8)
+    arp_bit = pin_bit(9)
+    watch_mask = KEY_PINS_MASK | chord_bit | arp_bit
+
+    def leave(self):
+        self.stop_arpeggiator()
+
+    def stop_arpeggiator(self):
+        arpeggiator = self.handler.arpeggiator
+        arpeggiator.set_notes(())
+        arpeggiator.set_active(False)
+
+    def play(self, notes):
+        handler = self.handler
+        arpeggiator = handler.arpeggiator
+        if handler.last_mask & self.arp_bit:
+            if not arpeggiator.active:
+                # The arpeggiator takes over the held notes
+                handler.sound(())
+                arpeggiator.set_active(True)
+            arpeggiator.set_notes(notes)
+            return False
+        if arpeggiator.active:
+            # Held keys sound directly again
+            self.stop_arpeggiator()
+        return handler.sound(notes)
+
+
+class FreeMode(Mode):
+    """Every single and double pin combination -> a chromatic note from C4"""
+    name = 'free'
+    watch_mask = FREE_NOTE_PINS_MASK
+    key_mask = FREE_NOTE_PINS_MASK
+    # Doesn't depend on the scale, so built once
+    note_table = note_tuples(compile_free_table(FREE_NOTE_PINS, 60))
+
+    def notes_for(self, mask):
+        return self.note_table[mask]
+
+
+class SingleMode(FreeMode):
+    """One free-mode pin at a time -> that pin's note of the current scale"""
+    name = 'single'
+
+    def rebuild(self):
+        self.note_table = note_tuples(compile_single_pin_table(FREE_NOTE_PINS, self.handler.get_current_notes()))
+
+
+MODES = {mode.name: mode for mode in (ScaleMode, ChordMode, ArpMode, FreeMode, SingleMode)}
@@ -8,17 +8,13 @@ from kivy.properties import ListProperty, NumericProperty
 from kivy.clock import Clock
 import math
 import mido
+from midi_out import DROP_OLDEST, MESSAGES, MidiSender
 
 # Set window size
 Window.size = (720, 720)
 
 # MIDI setup
 rtpmidi_port_name = 'rtpmidid:Network Export 128:0'  # Change if needed
-try:
-    outport = mido.open_output(rtpmidi_port_name)
-except Exception as e:
-    outport = None
-    print(f"MIDI port not found: {e}")
 
 # Distance mapping
 MIN_DIST = 50
@@ -26,6 +22,7 @@ MAX_DIST = 600
 CC_MIN = 0
 CC_MAX = 127
 CC_NUM = 3  # CC3
+CC_BYTES = MESSAGES.cc(CC_NUM)  # pre-encoded, indexed by value
 
 class DraggableBall(Widget):
     color = ListProperty([1, 0, 0])
@@ -59,8 +56,11 @@ class DraggableBall(Widget):
 class PinchCCWidget(Widget):
     cc_value = NumericProperty(0)
 
-    def __init__(self, **kwargs):
+    def __init__(self, out=None, **kwargs):
         super().__init__(**kwargs)
+        # Where CCs are queued (a MidiQueue or the host's shared sender),
+        # None when there is no MIDI port
+        self.out = out
         self.ball1 = DraggableBall(center=(200, 360), color=[0.2, 0.6, 1])
         self.ball2 = DraggableBall(center=(520, 360), color=[1, 0.4, 0.2])
         self.add_widget(self.ball1)
@@ -103,14 +103,25 @@ class PinchCCWidget(Widget):
         self.cc_value = cc_val
         self.label.text = f"CC3: {cc_val}"
         # Send MIDI CC if changed
-        if cc_val != self.last_cc and outport is not None:
-            msg = mido.Message('control_change', control=CC_NUM, value=cc_val)
-            outport.send(msg)
+        if cc_val != self.last_cc and self.out is not None:
+            self.out.send_bytes(CC_BYTES[cc_val])
             self.last_cc = cc_val
 
 class PinchCCApp(App):
     def build(self):
-        return PinchCCWidget()
+        try:
+            outport = mido.open_output(rtpmidi_port_name)
+        except Exception as e:
+            outport = None
+            print(f"MIDI port not found: {e}")
+        # The sender thread owns the port; the UI thread only queues messages
+        self.midi_sender = MidiSender(outport).start()
+        cc_out = self.midi_sender.open_queue('pinch', overflow=DROP_OLDEST) if outport is not None else None
+        return PinchCCWidget(out=cc_out)
+
+    def on_stop(self):
+        # Flush queued CCs before exit
+        self.midi_sender.stop()
 
 if __name__ == '__main__':
     PinchCCApp().run() 
\ No newline at end of file
@@ -8,6 +8,7 @@ from kivy.properties import ListProperty, NumericProperty
 from kivy.clock import Clock
 import math
 import mido
+from midi_out import DROP_OLDEST, MESSAGES, MidiSender
 
 # Set window size
 Window.size = (720, 720)
@@ -20,6 +21,10 @@ except Exception as e:
     outport = None
     print(f"MIDI port not found: {e}")
 
+# The sender thread owns the port; the UI thread only queues messages
+midi_sender = MidiSender(outport).start()
+cc_out = midi_sender.open_queue('pinch', overflow=DROP_OLDEST)
+
 # CC mapping
 CC_MIN = 0
 CC_MAX = 127
@@ -42,6 +47,7 @@ class DraggableBall(Widget):
         self.center = kwargs.get('center', (100, 100))
         self.color = kwargs.get('color', [1, 0, 0])
         self.cc_num = kwargs.get('cc_num', 3)
+        self.cc_bytes = MESSAGES.cc(self.cc_num)
         self.anchor = kwargs.get('anchor', [0, 360])
         self.label = Label(text="", font_size=20, color=(1,1,1,1), size_hint=(None, None), size=(80, 30))
         self.add_widget(self.label)
@@ -72,8 +78,7 @@ class DraggableBall(Widget):
         self.label.text = f"CC{self.cc_num}: {cc_val}"
         self.label.center = (self.center[0], self.center[1] + 50)
         if outport is not None and cc_val != self.last_cc:
-            msg = mido.Message('control_change', control=self.cc_num, value=cc_val)
-            outport.send(msg)
+            cc_out.send_bytes(self.cc_bytes[cc_val])
             self.last_cc = cc_val
 
 class PinchDualCCWidget(Widget):
@@ -118,5 +123,9 @@ class PinchDualCCApp(App):
     def build(self):
         return PinchDualCCWidget()
 
+    def on_stop(self):
+        # Flush queued CCs before exit
+        midi_sender.stop()
+
 if __name__ == '__main__':
     PinchDualCCApp().run() 
\ No newline at end of file
@@ -0,0 +1,198 @@
+"""Streaming binary recordings of all 12 electrodes
+
+A recording is a sequence of 32-byte records: a header, then chunks of
+`chunk_frames` frames, each chunk led by an index record.
+
+    header  magic 'TOUCHREC', version u16, channels u16, chunk_frames u32,
+            start wall time f64, 8 reserved bytes
+    index   tag u64 (INDEX_TAG), first frame number u64, its time f64,
+            wall time f64
+    frame   time f64 (seconds since the recording started), value u16 x 12
+
+Records go to disk from a background thread as they arrive, so memory
+stays flat and a crash loses at most the last moments. Because every
+record is the same width, a file can be memory-mapped as one array: the
+index records give a time -> chunk lookup without touching the frames.
+"""
+import csv
+import os
+import queue
+import struct
+import threading
+import time
+import numpy as np
+
+CHANNELS = 12
+VERSION = 1
+MAGIC = b'TOUCHREC'
+RECORD_SIZE = 32
+HEADER_STRUCT = struct.Struct('<8sHHId8x')
+INDEX_STRUCT = struct.Struct('<QQdd')
+FRAME_STRUCT = struct.Struct(f'<d{CHANNELS}H')
+# Can't be mistaken for a frame time: as a float64 it is a NaN
+INDEX_TAG = 0x7FF8_5445_5849_444E
+
+FRAME_DTYPE = np.dtype([('time', '<f8'), ('values', '<u2', (CHANNELS,))])
+INDEX_DTYPE = np.dtype([('tag', '<u8'), ('frame', '<u8'), ('time', '<f8'), ('wall', '<f8')])
+
+# One index record per this many frames: ~13 s at 20 Hz, ~2.5 s at 100 Hz
+DEFAULT_CHUNK_FRAMES = 256
+
+
+class Recorder:
+    """Streams frames to a recording file from a background writer thread
+
+    record() only queues the frame, so the sensor loop never waits on the
+    disk. The writer packs whatever has queued up, writes it in one call
+    and flushes, every `flush_interval` seconds at most.
+    """
+
+    def __init__(self, path, chunk_frames=DEFAULT_CHUNK_FRAMES, flush_interval=0.5):
+        self.path = path
+        self.chunk_frames = chunk_frames
+        self.flush_interval = flush_interval
+        self.start_wall = time.time()
+        self.start = None
+        self.frames = 0
+        self.queue = queue.SimpleQueue()
+        self.file = open(path, 'wb')
+        self.file.write(HEADER_STRUCT.pack(MAGIC, VERSION, CHANNELS, chunk_frames, self.start_wall))
+        self.file.flush()
+        self.thread = threading.Thread(target=self.write_loop, name='recorder', daemon=True)
+        self.thread.start()
+
+    def record(self, timestamp, frame):
+        """Queue one frame; timestamp is on the sensor's clock (seconds)"""
+        if self.start is None:
+            self.start = timestamp
+        self.queue.put((timestamp - self.start, frame))
+
+    def write_loop(self):
+        buffer = bytearray()
+        frames = 0
+        done = False
+        while not done:
+            item = self.queue.get()
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is None:
+                    done = True
+                    break
+                t, frame = item
+                if frames % self.chunk_frames == 0:
+                    buffer += INDEX_STRUCT.pack(INDEX_TAG, frames, t, self.start_wall + t)
+                buffer += FRAME_STRUCT.pack(t, *frame)
+                frames += 1
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self.queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+            self.file.write(buffer)
+            self.file.flush()
+            buffer.clear()
+            self.frames = frames
+
+    def close(self):
+        """Write everything still queued and close the file"""
+        self.queue.put(None)
+        self.thread.join()
+        self.file.close()
+
+
+class Recording:
+    """A recording file, memory-mapped
+
+    Frames are numbered from 0. frames(start, stop) and between(t0, t1)
+    return (times, values): float64 seconds and a uint16 array with one
+    column per electrode. seek() finds a frame by time through the index
+    records, reading one record per chunk plus a search inside one chunk.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            header = f.read(HEADER_STRUCT.size)
+        if len(header) < HEADER_STRUCT.size:
+            raise ValueError(f"{path}: too short to be a recording")
+        magic, version, channels, chunk_frames, self.start_wall = HEADER_STRUCT.unpack(header)
+        if magic != MAGIC:
+            raise ValueError(f"{path}: not a touch recording")
+        if version != VERSION or channels != CHANNELS:
+            raise ValueError(f"{path}: unsupported recording (version {version}, {channels} channels)")
+        self.chunk_frames = chunk_frames
+        # A record cut short by a crash is left out
+        count = (os.path.getsize(path) - HEADER_STRUCT.size) // RECORD_SIZE
+        if count:
+            self.records = np.memmap(path, dtype=FRAME_DTYPE, mode='r', offset=HEADER_STRUCT.size, shape=(count,))
+        else:
+            self.records = np.zeros(0, dtype=FRAME_DTYPE)
+        # Every chunk_frames + 1 records, one index record
+        self.index = self.records.view(INDEX_DTYPE)[::chunk_frames + 1]
+        if len(self.index) and self.index['tag'][0] != INDEX_TAG:
+            raise ValueError(f"{path}: index records missing")
+        self.frame_count = count - len(self.index)
+
+    def __len__(self):
+        return self.frame_count
+
+    @property
+    def duration(self):
+        if not self.frame_count:
+            return 0.0
+        return float(self.records['time'][self.position(self.frame_count - 1)])
+
+    def position(self, frame):
+        """Record number of a frame number, skipping the index records"""
+        return frame + frame // self.chunk_frames + 1
+
+    def frames(self, start=0, stop=None):
+        """(times, values) for frame numbers start..stop-1"""
+        stop = self.frame_count if stop is None else min(stop, self.frame_count)
+        start = max(0, min(start, stop))
+        if start == stop:
+            return np.zeros(0), np.zeros((0, CHANNELS), dtype=np.uint16)
+        first, last = self.position(start), self.position(stop - 1) + 1
+        block = self.records[first:last]
+        # Drop the index records that fall inside the range
+        is_frame = np.arange(first, last) % (self.chunk_frames + 1) != 0
+        block = block[is_frame]
+        return np.array(block['time']), np.array(block['values'])
+
+    def seek(self, t):
+        """Number of the first frame at or after t seconds"""
+        if not self.frame_count:
+            return 0
+        chunk = max(int(np.searchsorted(self.index['time'], t, side='right')) - 1, 0)
+        start = chunk * self.chunk_frames
+        stop = min(start + self.chunk_frames, self.frame_count)
+        first = self.position(start)
+        times = self.records['time'][first:first + (stop - start)]
+        return start + int(np.searchsorted(times, t, side='left'))
+
+    def between(self, t0, t1):
+        """(times, values) for frames with t0 <= time < t1"""
+        return self.frames(self.seek(t0), self.seek(t1))
+
+    def to_csv(self, path, pins=None):
+        """Write the CSV the touch/ tools and ReplayBackend read"""
+        pins = list(range(CHANNELS)) if pins is None else list(pins)
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['Time(s)'] + [f"Pin{pin}_Value" for pin in pins])
+            for start in range(0, self.frame_count, self.chunk_frames):
+                times, values = self.frames(start, start + self.chunk_frames)
+                for t, row in zip(times, values[:, pins].tolist()):
+                    writer.writerow([f"{t:.3f}"] + row)
+
+
+if __name__ == '__main__':
+    import sys
+    if len(sys.argv) < 3:
+        print("Usage: python recorder.py <recording.bin> <out.csv> [pin ...]")
+        sys.exit(1)
+    recording = Recording(sys.argv[1])
+    recording.to_csv(sys.argv[2], [int(pin) for pin in sys.argv[3:]] or None)
+    print(f"{len(recording)} frames ({recording.duration:.1f} s) written to {sys.argv[2]}")
@@ -3,6 +3,7 @@ import sys
 import signal
 
 # Start both scripts as subprocesses
+# (host.py runs both in one process; `python host.py --compare` measures the two)
 procs = []
 try:
     procs.append(subprocess.Popen([sys.executable, '7-key.py']))
@@ -0,0 +1,384 @@
+"""Shared MPR121 touch scanning helpers"""
+import bisect
+import csv
+import os
+import re
+import struct
+import threading
+import time
+
+# MPR121 registers
+MPR121_TOUCHSTATUS_L = 0x00
+MPR121_FILTDATA_0L = 0x04
+MPR121_BASELINE_0 = 0x1E
+
+# Filtered data for electrodes 0-11, two little-endian bytes each
+FRAME_STRUCT = struct.Struct('<12H')
+
+# All 12 electrodes
+ALL_PINS_MASK = 0x0FFF
+
+
+def pin_bit(pin):
+    """Bit for a single pin in a touch mask"""
+    return 1 << pin
+
+
+def is_touched(mask, pin):
+    """True if pin is set in the touch mask"""
+    return (mask >> pin) & 1 == 1
+
+
+class MPR121Backend:
+    """The real sensor on the Pi's I2C bus
+
+    Backends give the scanner three reads, each a single transaction:
+    read_status() for the 12-bit touch mask, read_filtered() for a
+    12-tuple of filtered data and read_baselines() for the chip's baseline
+    of each electrode, on the same scale. now() is the clock samples are
+    stamped with.
+    """
+
+    def __init__(self, address=0x5A):
+        # Hardware imports stay here so the rest can run off the Pi
+        import board
+        import busio
+        import adafruit_mpr121
+        self.address = address
+        self.i2c = busio.I2C(board.SCL, board.SDA)
+        self.mpr121 = adafruit_mpr121.MPR121(self.i2c, address=address)
+        self._status_buffer = bytearray(2)
+        self._frame_buffer = bytearray(FRAME_STRUCT.size)
+        self._baseline_buffer = bytearray(12)
+
+    def now(self):
+        return time.monotonic()
+
+    def read_status(self):
+        self.mpr121._read_register_bytes(MPR121_TOUCHSTATUS_L, self._status_buffer, 2)
+        return ((self._status_buffer[1] << 8) | self._status_buffer[0]) & ALL_PINS_MASK
+
+    def read_filtered(self):
+        self.mpr121._read_register_bytes(MPR121_FILTDATA_0L, self._frame_buffer, FRAME_STRUCT.size)
+        return FRAME_STRUCT.unpack_from(self._frame_buffer)
+
+    def read_baselines(self):
+        self.mpr121._read_register_bytes(MPR121_BASELINE_0, self._baseline_buffer, 12)
+        # The registers hold the top 8 of the baseline's 10 bits
+        return tuple(value << 2 for value in self._baseline_buffer)
+
+    def close(self):
+        self.i2c.deinit()
+
+
+class ReplayBackend:
+    """Fake MPR121 that plays back a CSV trace
+
+    The first column is time in seconds; columns named PinN (e.g. Pin0_Value)
+    hold raw values for pin N. A trace without PinN columns, like the ones
+    pin0_record.py writes, is read as pin 0. Pins missing from the trace read
+    as 0. Touches are derived the way the MPR121 does it: a pin is touched
+    once it moves touch_threshold away from its first sample and released
+    when it comes back within release_threshold. That first sample is also
+    what read_baselines() returns.
+
+    With realtime=True samples come out on the trace's own timeline; with
+    realtime=False every read steps to the next row, as fast as possible.
+    attach_irq() makes a realtime replay fire a FakeIRQ whenever its touch
+    mask changes, the way the MPR121 drives its IRQ line.
+    """
+
+    def __init__(self, path, realtime=True, loop=False, touch_threshold=12, release_threshold=6):
+        self.path = path
+        self.realtime = realtime
+        self.loop = loop
+        self.touch_threshold = touch_threshold
+        self.release_threshold = release_threshold
+        self.address = 0
+        self.times, self.frames = self._load(path)
+        self.baseline = self.frames[0]
+        self.duration = self.times[-1]
+        self.index = 0
+        self._next = 0
+        self.loops = 0
+        self.finished = False
+        self.last_mask = 0
+        self.start_time = time.monotonic()
+        self.irq = None
+        self.stopping = threading.Event()
+
+    @staticmethod
+    def _load(path):
+        with open(path, newline='') as f:
+            rows = list(csv.reader(f))
+        header, rows = rows[0], [row for row in rows[1:] if row]
+        pin_columns = {}
+        for column, name in enumerate(header[1:], start=1):
+            match = re.search(r'pin\s*(\d+)', name, re.IGNORECASE)
+            if match and int(match.group(1)) < 12:
+                pin_columns[int(match.group(1))] = column
+        if not pin_columns:
+            pin_columns = {0: 1}
+        times = []
+        frames = []
+        for row in rows:
+            times.append(float(row[0]))
+            frames.append(tuple(int(float(row[pin_columns[pin]])) if pin in pin_columns else 0
+                                for pin in range(12)))
+        return times, frames
+
+    def now(self):
+        if self.realtime:
+            return time.monotonic()
+        # Trace time, so fast replays still stamp samples realistically
+        return self.start_time + self.loops * self.duration + self.times[self.index]
+
+    def _advance(self):
+        if self.realtime:
+            elapsed = time.monotonic() - self.start_time
+            if self.loop and self.duration > 0:
+                elapsed %= self.duration
+            self.index = max(bisect.bisect_right(self.times, elapsed) - 1, 0)
+            self.finished = not self.loop and elapsed >= self.duration
+        else:
+            if self._next == len(self.times) and self.loop:
+                self._next = 0
+                self.loops += 1
+            if self._next < len(self.times):
+                self.index = self._next
+                self._next += 1
+            else:
+                self.finished = True
+        return self.frames[self.index]
+
+    def _mask(self, frame, last_mask):
+        mask = 0
+        for pin in range(12):
+            delta = abs(frame[pin] - self.baseline[pin])
+            was_touched = (last_mask >> pin) & 1
+            if delta > self.touch_threshold or (was_touched and delta > self.release_threshold):
+                mask |= 1 << pin
+        return mask
+
+    def read_status(self):
+        self.last_mask = self._mask(self._advance(), self.last_mask)
+        return self.last_mask
+
+    def read_filtered(self):
+        return self._advance()
+
+    def read_baselines(self):
+        return self.baseline
+
+    def attach_irq(self, irq):
+        """Trigger irq on every touch mask change along the trace's timeline"""
+        if not self.realtime:
+            raise ValueError("IRQ replay needs a realtime trace")
+        self.irq = irq
+        threading.Thread(target=self._watch, name='replay-irq', daemon=True).start()
+
+    def _watch(self):
+        mask = 0
+        loops = 0
+        while True:
+            for t, frame in zip(self.times, self.frames):
+                # Sleep until the row is due; close() cuts the wait short
+                due = self.start_time + loops * self.duration + t
+                if self.stopping.wait(max(due - time.monotonic(), 0)):
+                    return
+                new_mask = self._mask(frame, mask)
+                if new_mask != mask:
+                    mask = new_mask
+                    self.irq.trigger()
+            if not self.loop or self.duration <= 0:
+                return
+            loops += 1
+
+    def close(self):
+        self.stopping.set()
+
+
+def open_backend(replay=None, realtime=True):
+    """The MPR121, or a ReplayBackend if a trace is given or TOUCH_REPLAY is set"""
+    replay = replay or os.environ.get('TOUCH_REPLAY')
+    if replay:
+        print(f"Replaying touch trace: {replay}")
+        return ReplayBackend(replay, realtime=realtime)
+    return MPR121Backend()
+
+
+class LgpioIRQ:
+    """Falling-edge watcher on the MPR121 IRQ line
+
+    The MPR121 pulls IRQ low whenever the touch status changes and releases
+    it once the status register has been read.
+    """
+
+    def __init__(self, gpio, chip=0):
+        import lgpio
+        self._lgpio = lgpio
+        self.gpio = gpio
+        self.handle = lgpio.gpiochip_open(chip)
+        # IRQ is open drain, so it needs the pull-up
+        lgpio.gpio_claim_alert(self.handle, gpio, lgpio.FALLING_EDGE, lgpio.SET_PULL_UP)
+        self._event = threading.Event()
+        self._callback = lgpio.callback(self.handle, gpio, lgpio.FALLING_EDGE, self._on_edge)
+
+    def _on_edge(self, chip, gpio, level, tick):
+        self._event.set()
+
+    def is_asserted(self):
+        return self._lgpio.gpio_read(self.handle, self.gpio) == 0
+
+    def wait(self, timeout):
+        """Block until a falling edge (or a line still held low), True if fired"""
+        fired = self._event.wait(timeout) or self.is_asserted()
+        self._event.clear()
+        return fired
+
+    def close(self):
+        self._callback.cancel()
+        self._lgpio.gpiochip_close(self.handle)
+
+
+class FakeIRQ:
+    """Stand-in for LgpioIRQ so the IRQ path can run without a Pi
+
+    Call trigger() from another thread to simulate the MPR121 pulling the
+    line low; open_irq() hands one to a ReplayBackend, which does that
+    whenever its replayed touch mask changes.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self.asserted = False
+
+    def trigger(self):
+        self.asserted = True
+        self._event.set()
+
+    def is_asserted(self):
+        return self.asserted
+
+    def wait(self, timeout):
+        fired = self._event.wait(timeout) or self.asserted
+        self._event.clear()
+        self.asserted = False
+        return fired
+
+    def close(self):
+        pass
+
+
+def open_irq(gpio, backend=None):
+    """Open the IRQ line, or return None to fall back to polling
+
+    A replayed trace has no line to watch, so it gets a FakeIRQ that the
+    replay triggers itself.
+    """
+    if gpio is None:
+        return None
+    if isinstance(backend, ReplayBackend) and backend.realtime:
+        irq = FakeIRQ()
+        backend.attach_irq(irq)
+        return irq
+    try:
+        return LgpioIRQ(gpio)
+    except Exception as e:
+        print(f"MPR121 IRQ unavailable on GPIO {gpio}, polling instead: {e}")
+        return None
+
+
+class TouchScanner:
+    """Reads the touch state of all 12 pins in one I2C transaction
+
+    `mpr121[i].value` costs one bus transaction per pin, so a loop reading
+    the keys and the control pins does 4-10 reads per tick. The touch status
+    register holds every pin as one 12-bit mask, so we read that instead.
+
+    Reads may come from several threads (the engine's sensor and pressure
+    tasks), so each one holds `lock` for the whole transaction: the
+    backends reuse their buffers and replay state between reads.
+    """
+
+    def __init__(self, backend, irq=None, poll_interval=0.01, irq_timeout=0.5):
+        self.backend = backend
+        self.irq = irq
+        self.poll_interval = poll_interval
+        # In IRQ mode, resync this often in case an edge was missed
+        self.irq_timeout = irq_timeout
+        self.last_mask = 0
+        self.lock = threading.Lock()
+        # Bus load counters: status reads per tick, and the data reads
+        # (pressure, velocity) counted apart so they don't skew it
+        self.transactions = 0
+        self.frame_reads = 0
+        self.ticks = 0
+        # Ticks where the mask was unchanged and the loop skipped all work
+        self.idle_ticks = 0
+
+    def read_mask(self):
+        """Read the touch status register and return a 12-bit mask"""
+        with self.lock:
+            self.last_mask = self.backend.read_status()
+            self.transactions += 1
+            return self.last_mask
+
+    def read_frame(self):
+        """Read filtered data for all 12 electrodes in one transaction
+
+        Returns (timestamp, frame) where frame is a 12-tuple of raw values and
+        timestamp is the backend clock at the start of the read, so every pin
+        in the frame shares the same sample time.
+        """
+        with self.lock:
+            timestamp = self.backend.now()
+            frame = self.backend.read_filtered()
+            self.frame_reads += 1
+        return timestamp, frame
+
+    def read_baselines(self):
+        """The MPR121's baseline for all 12 electrodes, in one transaction"""
+        with self.lock:
+            baselines = self.backend.read_baselines()
+            self.frame_reads += 1
+        return baselines
+
+    def wait_mask(self):
+        """Wait for the next touch state
+
+        With an IRQ line this blocks until the MPR121 reports a change (or
+        the resync timeout passes); otherwise it polls every poll_interval.
+        """
+        if self.irq is None:
+            time.sleep(self.poll_interval)
+        else:
+            self.irq.wait(self.irq_timeout)
+        return self.read_mask()
+
+    def close(self):
+        if self.irq is not None:
+            self.irq.close()
+        self.backend.close()
+
+    def tick(self, idle=False):
+        """Mark the end of one loop iteration"""
+        self.ticks += 1
+        if idle:
+            self.idle_ticks += 1
+
+    def transactions_per_tick(self):
+        if self.ticks == 0:
+            return 0.0
+        return self.transactions / self.ticks
+
+    def idle_share(self):
+        if self.ticks == 0:
+            return 0.0
+        return self.idle_ticks / self.ticks
+
+    def stats(self):
+        return (f"I2C transactions: {self.transactions} over {self.ticks} ticks "
+                f"({self.transactions_per_tick():.2f} per tick), "
+                f"{self.idle_share():.1%} idle ticks skipped\n"
+                f"Frame reads: {self.frame_reads}")
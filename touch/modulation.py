@@ -1,14 +1,16 @@
+import os
+import sys
 import time
-import board
-import busio
-import adafruit_mpr121
 import matplotlib.pyplot as plt
 import matplotlib.animation as animation
-from collections import deque
 
-# Setup I2C and MPR121
-i2c = busio.I2C(board.SCL, board.SDA)
-mpr121 = adafruit_mpr121.MPR121(i2c)
+# Shared helpers live in the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from history import RingHistory
+from sensor import TouchScanner, open_backend
+
+# Setup MPR121 (or replay a trace from TOUCH_REPLAY)
+scanner = TouchScanner(open_backend())
 
 # Pin groups
 pins_group1 = [0, 1, 2, 3]
@@ -20,9 +22,8 @@ window_seconds = 30
 sample_rate = 20  # Hz
 maxlen = window_seconds * sample_rate
 
-# Data storage
-history = {pin: deque(maxlen=maxlen) for pin in range(12)}
-time_history = deque(maxlen=maxlen)
+# Data storage: the last maxlen frames, preallocated
+history = RingHistory(maxlen)
 
 # Colors for each pin
 colors = {
@@ -53,28 +54,28 @@ for ax, group, title in zip(
     legends.append(labels)
 axes[-1].set_xlabel("Time (s)")
 
-start_time = time.time()
+start_time = time.monotonic()
 # Prompt user for output file name
 output_file = input('Enter the filename to save the plot (e.g., touch_plot.png): ')
 run_duration = 15  # seconds
 
 def update(frame):
-    now = time.time() - start_time
+    now = time.monotonic() - start_time
     if now >= run_duration:
         plt.savefig(output_file)
         plt.close(fig)
         return []
-    time_history.append(now)
-    for pin in range(12):
-        try:
-            val = mpr121[pin].raw_value
-        except Exception:
-            val = 0
-        history[pin].append(val)
+    # Burst read all 12 pins so they share one timestamp
+    try:
+        timestamp, values = scanner.read_frame()
+        history.append(timestamp - start_time, values)
+    except Exception:
+        history.append(now, (0,) * 12)
+    times = history.times()
     # Update each subplot
     for ax, lines, group in zip(axes, plots, [pins_group1, pins_group2, pins_group3]):
         for i, pin in enumerate(group):
-            lines[i].set_data(time_history, history[pin])
+            lines[i].set_data(times, history.series(pin))
         ax.relim()
         ax.autoscale_view()
         ax.set_xlim(max(0, now - window_seconds), now)
@@ -1,11 +1,14 @@
+import os
+import sys
 import time
-import board
-import busio
-import adafruit_mpr121
 
-# Setup I2C and MPR121
-i2c = busio.I2C(board.SCL, board.SDA)
-mpr121 = adafruit_mpr121.MPR121(i2c)
+# Shared helpers live in the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from recorder import Recorder, Recording
+from sensor import TouchScanner, open_backend
+
+# Setup MPR121 (or replay a trace from TOUCH_REPLAY)
+scanner = TouchScanner(open_backend())
 
 # Recording settings
 record_duration = 10  # seconds
@@ -14,6 +17,11 @@ interval = 1.0 / sample_rate  # 0.05 seconds between samples
 
 # Get filename from user
 filename = input('Enter filename to save data (e.g., pin0_data.txt): ')
+# All 12 electrodes stream to this file while we record; the CSV is
+# exported from it at the end
+binary_filename = os.path.splitext(filename)[0] + '.bin'
+if binary_filename == filename:
+    binary_filename += '.rec'
 
 print(f"Recording Pin 0 values for {record_duration} seconds...")
 print("Starting in 3 seconds...")
@@ -21,7 +29,7 @@ time.sleep(3)
 
 # Start recording
 start_time = time.time()
-data = []
+recorder = Recorder(binary_filename)
 
 print("Recording started!")
 while True:
@@ -29,25 +37,24 @@ while True:
     if current_time >= record_duration:
         break
     
-    # Read pin 0 value
+    # Read all 12 pins in one transaction and hand them to the writer
     try:
-        pin0_value = mpr121[0].raw_value
+        timestamp, frame = scanner.read_frame()
     except Exception:
-        pin0_value = 0
-    
-    # Store timestamp and value
-    data.append(f"{current_time:.3f},{pin0_value}")
+        time.sleep(interval)
+        continue
+    recorder.record(timestamp, frame)
+    pin0_value = frame[0]
     print(f"Time: {current_time:.2f}s, Pin 0: {pin0_value}")
     
     time.sleep(interval)
 
+recorder.close()
 print(f"\nRecording complete! Saving to {filename}...")
 
-# Save data to file
-with open(filename, 'w') as f:
-    f.write("Time(s),Pin0_Value\n")  # Header
-    for line in data:
-        f.write(line + "\n")
+# Same CSV as before, exported from the binary recording
+recording = Recording(binary_filename)
+recording.to_csv(filename, pins=[0])
 
-print(f"Data saved to {filename}")
-print(f"Total samples recorded: {len(data)}") 
\ No newline at end of file
+print(f"Data saved to {filename} (all 12 pins in {binary_filename})")
+print(f"Total samples recorded: {len(recording)}") 
\ No newline at end of file
@@ -1,8 +1,13 @@
+import os
+import sys
 import time
 import board
 import busio
 import adafruit_mpr121
-from collections import deque
+
+# Shared helpers live in the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from filters import RunningMean, SlidingMedian
 
 # Setup I2C and MPR121
 i2c = busio.I2C(board.SCL, board.SDA)
@@ -13,14 +18,13 @@ window_size = 5  # Number of samples for moving average
 alpha = 0.3      # Smoothing factor for exponential moving average (0-1, lower = more smoothing)
 
 # Data storage for filters
-moving_avg_buffer = deque(maxlen=window_size)
-median_buffer = deque(maxlen=window_size)
+moving_avg_window = RunningMean(window_size)
+median_window = SlidingMedian(window_size)
 exp_avg_value = None
 
 def moving_average_filter(new_value):
-    """Simple moving average filter"""
-    moving_avg_buffer.append(new_value)
-    return sum(moving_avg_buffer) / len(moving_avg_buffer)
+    """Simple moving average filter (running sum, O(1) per sample)"""
+    return moving_avg_window.add(new_value)
 
 def exponential_moving_average(new_value):
     """Exponential moving average filter"""
@@ -32,14 +36,8 @@ def exponential_moving_average(new_value):
     return exp_avg_value
 
 def median_filter(new_value):
-    """Median filter - good for removing spikes"""
-    median_buffer.append(new_value)
-    sorted_values = sorted(median_buffer)
-    n = len(sorted_values)
-    if n % 2 == 0:
-        return (sorted_values[n//2 - 1] + sorted_values[n//2]) / 2
-    else:
-        return sorted_values[n//2]
+    """Median filter - good for removing spikes (two heaps, O(log n) per sample)"""
+    return median_window.add(new_value)
 
 print("Pin 0 Capacitance with Noise Filtering")
 print("Raw Value | Moving Avg | Exp Avg | Median Filter")
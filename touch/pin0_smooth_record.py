@@ -1,12 +1,15 @@
+import os
+import sys
 import time
-import board
-import busio
-import adafruit_mpr121
-from collections import deque
 
-# Setup I2C and MPR121
-i2c = busio.I2C(board.SCL, board.SDA)
-mpr121 = adafruit_mpr121.MPR121(i2c)
+# Shared helpers live in the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from filters import RunningMean
+from recorder import Recorder
+from sensor import TouchScanner, open_backend
+
+# Setup MPR121 (or replay a trace from TOUCH_REPLAY)
+scanner = TouchScanner(open_backend())
 
 # Recording settings
 record_duration = 10  # seconds
@@ -18,13 +21,12 @@ window_size = 5  # Number of samples for moving average
 alpha = 0.2      # Lower = more smoothing (0.1-0.3 recommended)
 
 # Data storage for filters
-moving_avg_buffer = deque(maxlen=window_size)
+moving_avg_window = RunningMean(window_size)
 exp_avg_value = None
 
 def moving_average_filter(new_value):
-    """Simple moving average filter"""
-    moving_avg_buffer.append(new_value)
-    return sum(moving_avg_buffer) / len(moving_avg_buffer)
+    """Simple moving average filter (running sum, O(1) per sample)"""
+    return moving_avg_window.add(new_value)
 
 def exponential_moving_average(new_value):
     """Exponential moving average filter"""
@@ -37,6 +39,10 @@ def exponential_moving_average(new_value):
 
 # Get filename from user
 filename = input('Enter filename to save smoothed data (e.g., pin0_smooth.txt): ')
+# Raw frames of all 12 electrodes go here alongside the smoothed CSV
+binary_filename = os.path.splitext(filename)[0] + '.bin'
+if binary_filename == filename:
+    binary_filename += '.rec'
 
 print(f"Recording Pin 0 values for {record_duration} seconds with smoothing...")
 print("Starting in 3 seconds...")
@@ -44,7 +50,11 @@ time.sleep(3)
 
 # Start recording
 start_time = time.time()
-data = []
+recorder = Recorder(binary_filename)
+samples = 0
+# Rows go out as they are read instead of piling up until the end
+f = open(filename, 'w', buffering=1)
+f.write("Time(s),Raw_Value,Moving_Average,Exponential_Average\n")  # Header
 
 print("Recording started!")
 while True:
@@ -54,30 +64,30 @@ while True:
     
     # Read raw value
     try:
-        raw_value = mpr121[0].raw_value
+        timestamp, frame = scanner.read_frame()
     except Exception:
-        raw_value = 0
+        time.sleep(interval)
+        continue
+    recorder.record(timestamp, frame)
+    raw_value = frame[0]
     
     # Apply smoothing filters
     moving_avg = moving_average_filter(raw_value)
     exp_avg = exponential_moving_average(raw_value)
     
     # Store all values
-    data.append(f"{current_time:.3f},{raw_value},{moving_avg:.1f},{exp_avg:.1f}")
+    f.write(f"{current_time:.3f},{raw_value},{moving_avg:.1f},{exp_avg:.1f}\n")
+    samples += 1
     print(f"Time: {current_time:.2f}s | Raw: {raw_value} | MovAvg: {moving_avg:.1f} | ExpAvg: {exp_avg:.1f}")
     
     time.sleep(interval)
 
-print(f"\nRecording complete! Saving to {filename}...")
-
-# Save data to file
-with open(filename, 'w') as f:
-    f.write("Time(s),Raw_Value,Moving_Average,Exponential_Average\n")  # Header
-    for line in data:
-        f.write(line + "\n")
+f.close()
+recorder.close()
 
-print(f"Data saved to {filename}")
-print(f"Total samples recorded: {len(data)}")
+print("\nRecording complete!")
+print(f"Data saved to {filename} (all 12 raw pins in {binary_filename})")
+print(f"Total samples recorded: {samples}")
 print("\nSmoothing methods used:")
 print(f"- Moving Average: window size = {window_size}")
 print(f"- Exponential Average: alpha = {alpha} (lower = more smoothing)") 
\ No newline at end of file
@@ -1,35 +1,46 @@
+import os
+import sys
 import time
-import board
-import busio
-import adafruit_mpr121
 import matplotlib.pyplot as plt
 import matplotlib.animation as animation
-from collections import deque
 
-# Setup I2C and MPR121
-i2c = busio.I2C(board.SCL, board.SDA)
-mpr121 = adafruit_mpr121.MPR121(i2c)
+# Shared helpers live in the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from baseline import BaselineTracker, load_profile, save_profile
+from filters import SlidingRange
+from history import RingHistory
+from sensor import TouchScanner, open_backend
+
+# Setup MPR121 (or replay a trace from TOUCH_REPLAY)
+scanner = TouchScanner(open_backend())
 
 # Control parameters
 alpha = 0.4          # Exponential smoothing (0.3-0.5 for responsive control)
 deadband = 2         # Ignore changes smaller than this (reduces jitter)
 scale_min = 0        # Minimum output value
 scale_max = 127      # Maximum output value (MIDI range)
+control_pin = 0
 
 # Plot settings
 window_seconds = 10  # Show last 10 seconds
 sample_rate = 20     # Hz
 maxlen = window_seconds * sample_rate
 
-# Data storage
-time_history = deque(maxlen=maxlen)
-raw_history = deque(maxlen=maxlen)
-smoothed_history = deque(maxlen=maxlen)
-scaled_history = deque(maxlen=maxlen)
-
-# Calibration values (will be set during calibration)
-touch_min = None
-touch_max = None
+# Data storage: raw, smoothed and scaled columns for the last maxlen frames
+RAW, SMOOTHED, SCALED = range(3)
+history = RingHistory(maxlen, columns=3)
+# Extremes of the raw and smoothed windows, for the y-axis
+raw_range = SlidingRange(maxlen)
+smoothed_range = SlidingRange(maxlen)
+
+# Live calibration: follows every pin's baseline and touch depth while we
+# play, so there is no calibration step and no drift over a long set. It
+# starts from the profile saved last time for this board
+board_address = scanner.backend.address
+load_start = time.perf_counter()
+tracker = BaselineTracker(profile=load_profile(board_address))
+print(f"Calibration profile: {len(tracker.profile)} pins loaded in "
+      f"{(time.perf_counter() - load_start) * 1000:.1f} ms")
 
 # State variables
 smoothed_value = None
@@ -53,58 +64,12 @@ def scale_value(value, input_min, input_max, output_min, output_max):
     """Scale input range to output range"""
     if input_max == input_min:
         return output_min
-    # Clamp input to range
-    value = max(input_min, min(input_max, value))
+    # Clamp input to range (touches lower the reading, so max can be below min)
+    value = max(min(input_min, input_max), min(max(input_min, input_max), value))
     # Scale to 0-1, then to output range
     normalized = (value - input_min) / (input_max - input_min)
     return output_min + normalized * (output_max - output_min)
 
-def calibrate():
-    """Calibrate touch range"""
-    global touch_min, touch_max
-    
-    print("=== CALIBRATION ===")
-    print("1. Don't touch the sensor for 3 seconds...")
-    time.sleep(1)
-    
-    # Get baseline (no touch)
-    baseline_readings = []
-    for i in range(30):  # 3 seconds at 10Hz
-        try:
-            val = mpr121[0].raw_value
-            baseline_readings.append(val)
-            print(f"Baseline reading {i+1}/30: {val}")
-        except:
-            baseline_readings.append(0)
-        time.sleep(0.1)
-    
-    touch_min = sum(baseline_readings) / len(baseline_readings)
-    
-    print(f"\n2. Now touch the sensor firmly for 3 seconds...")
-    time.sleep(1)
-    
-    # Get maximum touch
-    touch_readings = []
-    for i in range(30):  # 3 seconds at 10Hz
-        try:
-            val = mpr121[0].raw_value
-            touch_readings.append(val)
-            print(f"Touch reading {i+1}/30: {val}")
-        except:
-            touch_readings.append(0)
-        time.sleep(0.1)
-    
-    touch_max = sum(touch_readings) / len(touch_readings)
-    
-    print(f"\nCalibration complete!")
-    print(f"No touch (min): {touch_min:.1f}")
-    print(f"Full touch (max): {touch_max:.1f}")
-    print(f"Range: {touch_max - touch_min:.1f}")
-    print("\nStarting live plot...\n")
-
-# Perform calibration
-calibrate()
-
 # Setup plot with two subplots
 fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 8), sharex=True)
 
@@ -131,13 +96,18 @@ def update_plot(frame):
     global smoothed_value, last_output
     
     now = time.time() - start_time
-    time_history.append(now)
     
-    # Read raw value
+    # Read all 12 pins; the tracker updates every baseline from them
     try:
-        raw_value = mpr121[0].raw_value
+        timestamp, values = scanner.read_frame()
     except Exception:
-        raw_value = touch_min if touch_min else 0
+        return raw_line, smoothed_line, scaled_line
+    tracker.update(values, timestamp)
+    if tracker.frames == 1 and tracker.recalibrated:
+        print(f"Recalibrating pins {tracker.recalibrated}: baseline moved since last run")
+    raw_value = values[control_pin]
+    touch_min = tracker.touch_min[control_pin]
+    touch_max = tracker.touch_max[control_pin]
     
     # Apply exponential smoothing
     smoothed_value = exponential_smooth(raw_value, smoothed_value, alpha)
@@ -149,21 +119,20 @@ def update_plot(frame):
     scaled_value = scale_value(smoothed_with_deadband, touch_min, touch_max, scale_min, scale_max)
     
     # Store data
-    raw_history.append(raw_value)
-    smoothed_history.append(smoothed_value)
-    scaled_history.append(scaled_value)
+    history.append(now, (raw_value, smoothed_value, scaled_value))
+    raw_min, raw_max = raw_range.add(raw_value)
+    smoothed_min, smoothed_max = smoothed_range.add(smoothed_value)
     
     # Update plots
-    raw_line.set_data(time_history, raw_history)
-    smoothed_line.set_data(time_history, smoothed_history)
-    scaled_line.set_data(time_history, scaled_history)
+    times = history.times()
+    raw_line.set_data(times, history.series(RAW))
+    smoothed_line.set_data(times, history.series(SMOOTHED))
+    scaled_line.set_data(times, history.series(SCALED))
     
     # Auto-scale y-axis for raw/smoothed plot
-    if len(raw_history) > 0:
-        all_values = list(raw_history) + list(smoothed_history)
-        y_min, y_max = min(all_values), max(all_values)
-        margin = (y_max - y_min) * 0.1
-        ax1.set_ylim(y_min - margin, y_max + margin)
+    y_min, y_max = min(raw_min, smoothed_min), max(raw_max, smoothed_max)
+    margin = (y_max - y_min) * 0.1
+    ax1.set_ylim(y_min - margin, y_max + margin)
     
     # Set x-axis limits
     ax1.set_xlim(max(0, now - window_seconds), now)
@@ -181,4 +150,7 @@ ani = animation.FuncAnimation(
 plt.tight_layout()
 plt.show()
 
+# Next start picks up from here
+if tracker.frames:
+    save_profile(board_address, tracker)
 print("Plot closed. Touch control session ended.") 
\ No newline at end of file
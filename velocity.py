@@ -0,0 +1,71 @@
+"""Note velocity from how far a pad's reading has fallen at the touch edge"""
+import time
+
+# Softest and hardest velocity the curve reaches. A press barely past the
+# touch threshold still has to be heard, so the floor is well above 1
+MIN_VELOCITY = 32
+MAX_VELOCITY = 127
+
+
+class VelocityEstimator:
+    """Estimates velocity from a short burst of reads right after a touch
+
+    The touch status only says that a pad crossed its threshold. A strike
+    has fallen most of the way to full depth by the time that is read; a
+    slow press has barely passed the threshold. So right after the status
+    flips, burst() reads the filtered data `samples` times, `interval`
+    seconds apart (the MPR121 refreshes it every millisecond), and takes
+    the deepest fall below the chip's baseline among the newly touched
+    pins. Measured from the baseline, the fall before the status flipped
+    counts as much as the fall during the burst. The depth in counts is
+    mapped from [min_depth, max_depth] onto the velocity range through
+    x ** curve, so curve < 1 gives soft playing more velocity and curve > 1
+    makes loud notes harder to reach.
+
+    The defaults were tuned on a simulated 1 kHz trace of strikes falling
+    45-60 counts with time constants from 2 to 80 ms: slow presses land
+    near min_depth, hard strikes at max_depth or beyond.
+
+    The burst runs on the sensor thread before the touch is queued, so it
+    delays the note-on by about samples x (interval + one frame read);
+    bench_velocity.py measures it.
+    """
+
+    def __init__(self, pins_mask, samples=3, interval=0.001, min_depth=14.0, max_depth=50.0,
+                 curve=1.0, min_velocity=MIN_VELOCITY, max_velocity=MAX_VELOCITY):
+        if samples < 1:
+            raise ValueError("a burst needs at least 1 sample")
+        self.pins_mask = pins_mask
+        self.samples = samples
+        self.interval = interval
+        self.min_depth = min_depth
+        self.max_depth = max_depth
+        self.curve = curve
+        self.min_velocity = min_velocity
+        self.max_velocity = max_velocity
+        self.frames = [None] * samples
+        self.estimates = 0
+
+    def burst(self, scanner, onsets):
+        """Read the burst for the pins in `onsets` and return a velocity"""
+        pins = [pin for pin in range(12) if (onsets >> pin) & 1]
+        frames = self.frames
+        for i in range(self.samples):
+            if i:
+                time.sleep(self.interval)
+            _, frames[i] = scanner.read_frame()
+        # Milliseconds into a touch the baseline is still the untouched level
+        baselines = scanner.read_baselines()
+        self.estimates += 1
+        return self.velocity(max(self.depth(pin, baselines[pin]) for pin in pins))
+
+    def depth(self, pin, baseline):
+        """Deepest fall below baseline of one pin over the burst, in counts"""
+        # A touch lowers the reading
+        return max(baseline - frame[pin] for frame in self.frames)
+
+    def velocity(self, depth):
+        """Map a fall in counts onto the velocity curve"""
+        x = (depth - self.min_depth) / (self.max_depth - self.min_depth)
+        x = min(max(x, 0.0), 1.0) ** self.curve
+        return round(self.min_velocity + x * (self.max_velocity - self.min_velocity))